@@ -1,10 +1,17 @@
 # backend/app/main.py
 
+import os
+import json
+import time
 import uuid
+import asyncio
 import logging
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 # Import our new API models
 from app.models.api_models import AnalyzeRequest, AnalyzeResponse, ReportStatusResponse
@@ -12,19 +19,52 @@ from app.models.api_models import AnalyzeRequest, AnalyzeResponse, ReportStatusR
 # Import all our services
 from app.services import search_service
 from app.services import scraper
-from app.services import features
 from app.services import llm_engine
-from app.models.page_data import PageData, ExtractedFeatures
+from app.services import browser_pool
+from app.services import cpu_pool
+from app.services import http_client
+from app.services import domain_strategy
+from app.services import singleflight
+from app.services.job_queue import job_queue, QueueFull
+from app.services.job_store import job_store
+from app.services.idf_corpus import idf_corpus
+from app.workflow import run_analysis_workflow
 
 # --- App Setup ---
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Set to 0 to make this process API-only, with jobs executed by separate
+# `python -m app.worker` processes (needs JOB_QUEUE=sqlite and JOB_STORE=sqlite)
+API_RUNS_JOBS = os.getenv("API_RUNS_JOBS", "1") == "1"
+
+# Progress stream: how often the store is checked for new events,
+# and how often a keep-alive comment is sent on a quiet stream
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "0.5"))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the shared Playwright browsers, CPU pool, HTTP client and job workers once, and close them on shutdown
+    runs_jobs = API_RUNS_JOBS or job_queue.backend == "local"
+    if runs_jobs:
+        browser_pool.get_pool()
+        cpu_pool.start_pool()
+        http_client.get_client()
+        job_queue.start(run_analysis_workflow)
+    yield
+    if runs_jobs:
+        job_queue.shutdown()
+        browser_pool.shutdown_pool()
+        cpu_pool.shutdown_pool()
+        http_client.close_client()
+
 app = FastAPI(
     title="SEO Optimizer API",
     description="Analyzes a target URL against competitors for a search query.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- CORS Middleware ---
@@ -40,98 +80,6 @@ app.add_middleware(
     allow_methods=["GET", "POST"], # Only allow these methods
     allow_headers=["*"],
 )
-# --- Job Store ---
-# A simple in-memory dictionary to store job status.
-# For a real app, you'd use a database (Redis, SQL, etc.)
-job_store: Dict[str, ReportStatusResponse] = {}
-
-# --- The Main Workflow (Run in Background) ---
-
-def run_analysis_workflow(job_id: str, query: str, target_url: str):
-    """
-    This is the core function that runs all our phases.
-    It will be executed in the background.
-    """
-    try:
-        # Update job status
-        job_store[job_id].status = "RUNNING"
-        logger.info(f"Job {job_id}: Workflow started. Query: '{query}', Target: {target_url}")
-
-        # --- Phase 1: Search ---
-        logger.info(f"Job {job_id}: Starting Phase 1 (Search)")
-        search_results = search_service.get_search_results(query, num_results=7)
-        if not search_results.get("results"):
-            raise Exception("Phase 1 failed: No search results found.")
-        
-        competitor_urls = [r["url"] for r in search_results["results"]]
-        logger.info(f"Job {job_id}: Found competitors: {competitor_urls}")
-
-        # --- Phase 2 & 3: Scrape ---
-        logger.info(f"Job {job_id}: Starting Phase 2/3 (Scraping)")
-        
-        # Scrape target page
-        target_page = scraper.scrape_page(target_url)
-        if target_page.error:
-            logger.warning(f"Job {job_id}: Target page scrape failed: {target_page.error}. Continuing...")
-            # We can still analyze competitors
-
-        # Scrape competitor pages
-        competitor_pages: List[PageData] = []
-        for url in competitor_urls:
-            page = scraper.scrape_page(url)
-            if not page.error:
-                competitor_pages.append(page)
-            else:
-                logger.warning(f"Job {job_id}: Competitor scrape failed: {url}. Skipping.")
-        
-        if not competitor_pages:
-             raise Exception("Phase 2 failed: Could not scrape any competitor pages.")
-
-        # --- Phase 4: Feature Extraction ---
-        logger.info(f"Job {job_id}: Starting Phase 4 (Feature Extraction)")
-        
-        all_pages = [target_page] + competitor_pages
-        all_features: List[ExtractedFeatures] = []
-        all_content: List[str] = []
-
-        for page in all_pages:
-            if not page.error:
-                all_features.append(features.extract_features_from_page(page))
-                all_content.append(page.main_content or "")
-            else:
-                # Add empty placeholders if scrape failed
-                all_features.append(ExtractedFeatures(url=str(page.url), word_count=0))
-                all_content.append("")
-
-        target_features = all_features[0]
-        competitor_features = all_features[1:]
-        
-        # Note: We won't use TF-IDF for this demo to simplify the LLM prompt,
-        # as keyword density is already a very strong signal.
-
-        # --- Phase 5: LLM Comparison ---
-        logger.info(f"Job {job_id}: Starting Phase 5 (LLM Analysis)")
-        
-        report = llm_engine.get_llm_recommendations(
-            target_page=target_page,
-            target_features=target_features,
-            competitor_pages=competitor_pages,
-            competitor_features=competitor_features
-        )
-        
-        if "error" in report:
-            raise Exception(f"Phase 5 failed: {report['error']}")
-
-        # --- Phase 6: Report Complete ---
-        logger.info(f"Job {job_id}: Workflow complete. Storing report.")
-        job_store[job_id].status = "COMPLETE"
-        job_store[job_id].report = report
-
-    except Exception as e:
-        logger.error(f"Job {job_id}: Workflow failed. Error: {e}")
-        job_store[job_id].status = "FAILED"
-        job_store[job_id].error = str(e)
-
 
 # --- API Endpoints ---
 
@@ -139,27 +87,60 @@ def run_analysis_workflow(job_id: str, query: str, target_url: str):
 def read_root():
     return {"message": "SEO Optimizer API is running."}
 
+@app.get("/health")
+def health():
+    """
+    Reports the state of shared resources (job queue, browser pool, caches, coalescing).
+    """
+    return {
+        "status": "ok",
+        "job_queue": job_queue.stats(),
+        "job_store": job_store.stats(),
+        "browser_pool": browser_pool.pool_stats(),
+        "cpu_pool": cpu_pool.pool_stats(),
+        "http_client": http_client.client_stats(),
+        "scrape_cache": scraper.page_cache.stats(),
+        "search_cache": search_service.search_cache.stats(),
+        "llm_report_cache": llm_engine.report_cache.stats(),
+        "coalescing": singleflight.stats(),
+        "idf_corpus": idf_corpus.stats(),
+    }
+
+@app.get("/scraper/domains")
+def scraper_domains():
+    """
+    The learned per-domain scrape strategies (simple / playwright / skip).
+    """
+    return domain_strategy.strategy_table()
+
 @app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
+async def analyze(request: AnalyzeRequest):
     """
     Triggers a new analysis job.
-    This returns a job ID immediately and runs the analysis in the background.
+    This returns a job ID immediately and queues the analysis for a worker
+    (in this process or, with the SQLite queue, any worker process).
+    If the queue is full, responds 429 with a Retry-After header.
     """
     job_id = str(uuid.uuid4())
     
     # Create the initial job entry
-    job_store[job_id] = ReportStatusResponse(
-        job_id=job_id,
-        status="PENDING",
-    )
+    await run_in_threadpool(job_store.create, job_id)
     
-    # Add the long-running task to the background
-    background_tasks.add_task(
-        run_analysis_workflow,
-        job_id,
-        request.query,
-        str(request.target_url)
-    )
+    # Hand the long-running workflow to the job queue
+    try:
+        await run_in_threadpool(job_queue.submit, job_id, {
+            "query": request.query,
+            "target_url": str(request.target_url),
+            "bypass_cache": request.bypass_cache
+        })
+    except QueueFull as e:
+        await run_in_threadpool(job_store.delete, job_id)
+        logger.warning(f"Job {job_id}: Rejected, queue is full.")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many analyses in progress. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     
     logger.info(f"Job {job_id}: Created and queued.")
     
@@ -173,12 +154,92 @@ async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
 async def get_results(job_id: str):
     """
     Polls for the results of an analysis job.
+    Pending jobs include their position in the queue.
     """
-    job = job_store.get(job_id)
+    job = await run_in_threadpool(job_store.get, job_id)
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found.")
         
     logger.info(f"Job {job_id}: Status check. Current status: {job.status}")
     
-    return job
\ No newline at end of file
+    if job.status == "PENDING":
+        position = await run_in_threadpool(job_queue.position, job_id)
+        return job.model_copy(update={"queue_position": position})
+    return job
+
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Formats one Server-Sent Events message."""
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _job_events(job_id: str, last_seq: int) -> AsyncIterator[str]:
+    """
+    Streams the job's progress events as they are published, then the
+    final report (or error), and ends. Pending jobs get 'queued' updates.
+    """
+    last_position = None
+    finished_polls = 0
+    last_sent = time.monotonic()
+    while True:
+        job = await run_in_threadpool(job_store.get, job_id)
+        if job is None:
+            yield _sse("failed", {"error": "Job not found or expired."})
+            return
+
+        for event in await run_in_threadpool(job_store.events, job_id, last_seq):
+            last_seq = event["seq"]
+            data = event["data"]
+            if event["event"] == "complete":
+                # Read after the event: the snapshot above may predate the stored report
+                completed = await run_in_threadpool(job_store.get, job_id)
+                data = {**data, "report": completed.report if completed else None}
+            yield _sse(event["event"], data, event_id=event["seq"])
+            last_sent = time.monotonic()
+            if event["event"] in ("complete", "failed"):
+                return
+
+        if job.status in ("COMPLETE", "FAILED"):
+            # The terminal event is published just after the status is stored.
+            # If it never shows up (e.g. an older job), finish from the stored job.
+            finished_polls += 1
+            if finished_polls > 3:
+                if job.status == "COMPLETE":
+                    yield _sse("complete", {"report": job.report})
+                else:
+                    yield _sse("failed", {"error": job.error})
+                return
+
+        if job.status == "PENDING":
+            position = await run_in_threadpool(job_queue.position, job_id)
+            if position != last_position:
+                last_position = position
+                yield _sse("queued", {"position": position})
+                last_sent = time.monotonic()
+
+        if time.monotonic() - last_sent > EVENTS_KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+        await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+@app.get("/results/{job_id}/events")
+async def get_result_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events stream of a job's progress: search done, each page
+    scraped, features, LLM, then the final report, with per-phase timings.
+    Reconnecting clients resume after the Last-Event-ID they saw.
+    """
+    if await run_in_threadpool(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    try:
+        last_seq = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        last_seq = 0
+
+    return StreamingResponse(
+        _job_events(job_id, last_seq),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
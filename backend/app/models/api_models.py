@@ -5,6 +5,7 @@ class AnalyzeRequest (BaseModel):
     """The request model for the /analyze endpoint"""
     target_url: HttpUrl
     query:str
+    bypass_cache: bool = False  # Regenerate the LLM report even if a cached one exists
     
 class AnalyzeResponse (BaseModel):
     """The response model for the /analyze endpoint"""
@@ -17,4 +18,5 @@ class ReportStatusResponse(BaseModel):
     job_id: str
     status: str  # "PENDING", "RUNNING", "COMPLETE", "FAILED"
     report: Optional[Dict[str, Any]] = None # This will hold the LLM JSON
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+    queue_position: Optional[int] = None # 1-based place in the job queue while PENDING
\ No newline at end of file
@@ -30,6 +30,12 @@ class PageData(BaseModel):
     # Simple Metrics (from plan)
     # We will compute these in a later phase, but define them here
     readability_scores: Dict[str, float] = {}
+
+    # True if the download hit the size cap and only part of the page was parsed
+    truncated: bool = False
+
+    # Per-stage timings in ms (e.g. Playwright navigation / readiness / content)
+    timings: Dict[str, float] = {}
     
     # Error message if scraping failed
     error: Optional[str] = None
@@ -46,6 +52,9 @@ class ExtractedFeatures(BaseModel):
     # Top 50 1-3 grams and their densities
     keyword_densities: Dict[str, float] = {}
     
+    # Highest TF-IDF terms against the other pages in the job: [{"term": ..., "score": ...}]
+    distinctive_terms: List[Dict[str, Any]] = []
+    
     # Simple Metrics
     avg_word_length: float = 0.0
     
@@ -0,0 +1,385 @@
+# backend/app/services/browser_pool.py
+
+import os
+import queue
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from playwright.sync_api import sync_playwright, BrowserContext
+from playwright.async_api import async_playwright, Browser as AsyncBrowser, BrowserContext as AsyncBrowserContext
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Pool Settings ---
+# "async": one shared browser driven by playwright.async_api, rendering
+#          up to MAX_CONTEXTS pages at once in separate contexts (default)
+# "sync":  POOL_SIZE browsers, one page at a time each
+BROWSER_BACKEND = os.getenv("BROWSER_BACKEND", "async")
+
+# Sync backend: each browser is owned by one worker thread (the sync Playwright
+# API is bound to the thread that created it), so POOL_SIZE is also the maximum
+# number of browser contexts open at once.
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+MAX_PAGES_PER_BROWSER = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+
+# Async backend: contexts open at once in the shared browser
+MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "4"))
+
+# Longest a caller waits for a render (including time queued for a browser)
+RUN_TIMEOUT = float(os.getenv("BROWSER_RUN_TIMEOUT", "120"))
+
+
+class BrowserPool:
+    """
+    A long-lived pool of headless Chromium browsers.
+    Each render gets a fresh, isolated browser context. Browsers are
+    recycled after MAX_PAGES_PER_BROWSER pages or when they crash.
+    """
+
+    is_async = False
+
+    def __init__(self, size: int = POOL_SIZE, max_pages_per_browser: int = MAX_PAGES_PER_BROWSER):
+        self.size = max(1, size)
+        self.max_pages_per_browser = max(1, max_pages_per_browser)
+        self._tasks: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats = {
+            "browsers_alive": 0,
+            "active_contexts": 0,
+            "pages_rendered": 0,
+            "recycles": 0,
+            "crashes": 0,
+        }
+
+    def start(self):
+        """Starts one worker thread (and browser) per pool slot."""
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.size):
+                worker = threading.Thread(target=self._worker_loop, name=f"browser-pool-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Browser pool started with {self.size} browsers.")
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stops all workers and closes their browsers."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._tasks.put(None)
+        for worker in workers:
+            worker.join(timeout)
+        logger.info("Browser pool shut down.")
+
+    def run(self, task: Callable[[BrowserContext], Any], timeout: Optional[float] = RUN_TIMEOUT, **context_options) -> Any:
+        """
+        Runs `task(context)` in a fresh browser context and returns its result.
+        Any exception raised by the task is re-raised in the caller's thread.
+        Raises TimeoutError if no result arrives within `timeout` seconds.
+        """
+        if not self._workers:
+            self.start()
+        future: Future = Future()
+        self._tasks.put((task, context_options, future))
+        # Every worker may have died (e.g. Playwright failed to start) before the put
+        self._fail_if_no_workers()
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # Still queued: make sure no worker picks it up later
+            future.cancel()
+            raise TimeoutError(f"Browser pool gave no result within {timeout}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pool_size"] = self.size
+        stats["queue_depth"] = self._tasks.qsize()
+        return stats
+
+    def _bump(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _worker_loop(self):
+        stopped = False
+        try:
+            with sync_playwright() as p:
+                self._serve(p)
+                stopped = True
+        except Exception as e:
+            logger.error(f"Browser pool worker stopped: Playwright failed. Error: {e}")
+        if not stopped:
+            with self._lock:
+                if threading.current_thread() in self._workers:
+                    self._workers.remove(threading.current_thread())
+            self._fail_if_no_workers()
+
+    def _fail_if_no_workers(self):
+        # With no worker left, nothing would ever take queued renders: fail them now
+        with self._lock:
+            if self._workers:
+                return
+        while True:
+            try:
+                item = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[2].set_running_or_notify_cancel():
+                item[2].set_exception(RuntimeError("Browser pool has no running workers"))
+
+    def _serve(self, p):
+        """Serves renders with one browser until the shutdown sentinel arrives."""
+        browser = None
+        pages_served = 0
+
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                break
+            task, context_options, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            # (Re)launch the browser if needed
+            try:
+                if browser is not None and (pages_served >= self.max_pages_per_browser or not browser.is_connected()):
+                    logger.info(f"Recycling browser after {pages_served} pages.")
+                    self._close_browser(browser)
+                    browser = None
+                    self._bump("recycles")
+                if browser is None:
+                    browser = p.chromium.launch(headless=True)
+                    pages_served = 0
+                    self._bump("browsers_alive")
+            except Exception as e:
+                logger.error(f"Failed to launch browser. Error: {e}")
+                browser = None
+                future.set_exception(e)
+                continue
+
+            context = None
+            try:
+                context = browser.new_context(**context_options)
+                self._bump("active_contexts")
+                future.set_result(task(context))
+            except Exception as e:
+                future.set_exception(e)
+                if not browser.is_connected():
+                    logger.warning("Browser crashed. It will be replaced on the next page.")
+                    self._bump("crashes")
+            finally:
+                pages_served += 1
+                self._bump("pages_rendered")
+                if context is not None:
+                    self._bump("active_contexts", -1)
+                    try:
+                        context.close()
+                    except Exception:
+                        pass
+
+        if browser is not None:
+            self._close_browser(browser)
+
+    def _close_browser(self, browser):
+        try:
+            browser.close()
+        except Exception:
+            pass
+        self._bump("browsers_alive", -1)
+
+
+class AsyncBrowserPool:
+    """
+    A long-lived headless Chromium driven by the async Playwright API.
+    An event loop runs in a background thread. Callers from any thread
+    submit renders to it, and up to `max_contexts` pages render at once,
+    each in its own context. The browser is recycled after
+    `max_pages_per_browser` pages or when it crashes. A retired browser is
+    closed once its in-flight pages finish.
+    """
+
+    is_async = True
+
+    def __init__(self, max_contexts: int = MAX_CONTEXTS, max_pages_per_browser: int = MAX_PAGES_PER_BROWSER):
+        self.max_contexts = max(1, max_contexts)
+        self.max_pages_per_browser = max(1, max_pages_per_browser)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._playwright = None
+        self._browser: Optional[AsyncBrowser] = None
+        self._browser_pages = 0
+        self._active: Dict[AsyncBrowser, int] = {}
+        self._retiring: List[AsyncBrowser] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._stats = {
+            "waiting": 0,
+            "active_contexts": 0,
+            "pages_rendered": 0,
+            "recycles": 0,
+            "crashes": 0,
+        }
+
+    def start(self):
+        """Starts the event loop thread and the Playwright driver."""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="browser-pool-async", daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._startup(), loop).result(RUN_TIMEOUT)
+            except BaseException:
+                # Don't leave a loop thread behind; the next run() tries again
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(5)
+                raise
+            # Only publish the loop once it's ready to accept renders
+            self._loop, self._thread = loop, thread
+        logger.info(f"Async browser pool started (max {self.max_contexts} contexts).")
+
+    def shutdown(self, timeout: float = 10.0):
+        """Closes all browsers and stops the event loop."""
+        with self._start_lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(timeout)
+        except Exception as e:
+            logger.error(f"Error while closing browsers: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        logger.info("Async browser pool shut down.")
+
+    def run(self, task: Callable[[AsyncBrowserContext], Awaitable[Any]], timeout: Optional[float] = RUN_TIMEOUT, **context_options) -> Any:
+        """
+        Runs `await task(context)` in a fresh browser context and returns its result.
+        Blocks the calling thread only. Other callers' renders run concurrently.
+        Raises TimeoutError if no result arrives within `timeout` seconds.
+        """
+        if self._loop is None:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(self._run(task, context_options), self._loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Browser pool gave no result within {timeout}s")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["pool_size"] = 1 + len(self._retiring) if self._browser is not None else len(self._retiring)
+        stats["max_contexts"] = self.max_contexts
+        stats["queue_depth"] = stats.pop("waiting")
+        return stats
+
+    async def _startup(self):
+        self._semaphore = asyncio.Semaphore(self.max_contexts)
+        self._browser_lock = asyncio.Lock()
+        self._playwright = await async_playwright().start()
+
+    async def _acquire_browser(self) -> AsyncBrowser:
+        async with self._browser_lock:
+            browser = self._browser
+            if browser is not None and (self._browser_pages >= self.max_pages_per_browser or not browser.is_connected()):
+                if not browser.is_connected():
+                    logger.warning("Browser crashed. Replacing it.")
+                    self._stats["crashes"] += 1
+                else:
+                    logger.info(f"Recycling browser after {self._browser_pages} pages.")
+                self._stats["recycles"] += 1
+                self._browser = None
+                self._retiring.append(browser)
+                await self._close_if_idle(browser)
+
+            if self._browser is None:
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._browser_pages = 0
+                self._active[self._browser] = 0
+
+            self._browser_pages += 1
+            self._active[self._browser] += 1
+            return self._browser
+
+    async def _close_if_idle(self, browser: AsyncBrowser):
+        if browser in self._retiring and self._active.get(browser, 0) == 0:
+            self._retiring.remove(browser)
+            self._active.pop(browser, None)
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+    async def _run(self, task, context_options: Dict[str, Any]):
+        self._stats["waiting"] += 1
+        async with self._semaphore:
+            self._stats["waiting"] -= 1
+            browser = await self._acquire_browser()
+            context = None
+            try:
+                context = await browser.new_context(**context_options)
+                self._stats["active_contexts"] += 1
+                return await task(context)
+            finally:
+                if context is not None:
+                    self._stats["active_contexts"] -= 1
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                self._stats["pages_rendered"] += 1
+                self._active[browser] -= 1
+                await self._close_if_idle(browser)
+
+    async def _close_all(self):
+        browsers = self._retiring + ([self._browser] if self._browser is not None else [])
+        self._browser, self._retiring = None, []
+        for browser in browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+# --- Process-wide Pool ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the shared browser pool (per BROWSER_BACKEND), starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = AsyncBrowserPool() if BROWSER_BACKEND == "async" else BrowserPool()
+            _pool.start()
+        return _pool
+
+def shutdown_pool():
+    """Closes the shared browser pool (called on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+def pool_stats() -> Dict[str, Any]:
+    """Stats for the health endpoint. Does not start the pool."""
+    with _pool_lock:
+        pool = _pool
+    if pool is None:
+        return {"running": False, "backend": BROWSER_BACKEND}
+    return {"running": True, "backend": BROWSER_BACKEND, **pool.stats()}
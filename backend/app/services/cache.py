@@ -0,0 +1,217 @@
+# backend/app/services/cache.py
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# All on-disk caches live here (one SQLite file per cache)
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+    expired: bool
+
+
+class TTLCache:
+    """
+    A thread-safe in-memory cache with a TTL and LRU eviction.
+    Use this for small, hot results that don't need to survive a restart.
+    With `max_bytes`, entries are also evicted once the sizes given to
+    set() add up to more than that; a value bigger than the budget isn't cached.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (time.time() - entry[1]) > self.ttl_seconds:
+                if entry is not None:
+                    self._remove(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, size: int = 0):
+        """Stores a value; `size` is its approximate size in bytes (for max_bytes)."""
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, time.time(), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            if self.max_bytes is not None:
+                stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class DiskCache:
+    """
+    A small persistent key/value cache backed by SQLite.
+    Values are stored as JSON. Entries expire after `ttl_seconds` and the
+    least recently used entries are evicted once `max_entries` is exceeded.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale_hits": 0, "revalidated": 0, "evictions": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing a module never touches the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """
+        Returns the entry for `key`, or None on a miss.
+        With allow_stale=True, expired entries are returned (flagged as expired)
+        so the caller can revalidate them instead of refetching from scratch.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT value, stored_at FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._stats["misses"] += 1
+                    return None
+
+                expired = (now - row[1]) > self.ttl_seconds
+                if expired and not allow_stale:
+                    self._stats["misses"] += 1
+                    return None
+
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self._stats["stale_hits" if expired else "hits"] += 1
+            return CacheEntry(value=json.loads(row[0]), stored_at=row[1], expired=expired)
+        except Exception as e:
+            logger.error(f"Cache '{self.name}' read failed for {key}. Error: {e}")
+            return None
+
+    def set(self, key: str, value: Any):
+        """Stores a JSON-serializable value and evicts LRU entries if over the size limit."""
+        now = time.time()
+        try:
+            payload = json.dumps(value)
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, stored_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, now, now)
+                )
+                overflow = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM entries WHERE key IN "
+                        "(SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self._stats["evictions"] += overflow
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Cache '{self.name}' write failed for {key}. Error: {e}")
+
+    def touch(self, key: str):
+        """Marks an entry as fresh again (e.g. after a 304 Not Modified)."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("UPDATE entries SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+                conn.commit()
+                self._stats["revalidated"] += 1
+        except Exception as e:
+            logger.error(f"Cache '{self.name}' touch failed for {key}. Error: {e}")
+
+    def delete(self, key: str):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Cache '{self.name}' delete failed for {key}. Error: {e}")
+
+    def items(self) -> List[Tuple[str, Any, float]]:
+        """Returns every (key, value, stored_at), expired or not. Does not count as hits."""
+        try:
+            with self._lock:
+                rows = self._connect().execute("SELECT key, value, stored_at FROM entries ORDER BY key").fetchall()
+            return [(key, json.loads(value), stored_at) for key, value, stored_at in rows]
+        except Exception as e:
+            logger.error(f"Cache '{self.name}' listing failed. Error: {e}")
+            return []
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["miss_rate"] = round(1 - stats["hit_rate"], 4) if lookups else 0.0
+        return stats
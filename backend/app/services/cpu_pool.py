@@ -0,0 +1,129 @@
+# backend/app/services/cpu_pool.py
+#
+# An optional process pool for CPU-bound work: HTML parsing, tokenizing and
+# n-gram counting. In threads that work holds the GIL, so concurrent jobs
+# slow each other down; in worker processes it runs in parallel.
+#
+# Tasks are module-level functions that take raw inputs (bytes, strings) and
+# return small, plain results, since both directions are pickled.
+#
+# Workers don't share memory with the parent or with each other. In-memory
+# caches such as features.document_cache are per process: a task only hits
+# entries its own worker made, the parent's cache is never consulted, and a
+# replaced worker starts empty. State that must be shared lives on disk (the
+# IDF corpus, the DiskCaches), which every process opens for itself.
+
+import os
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Pool Settings ---
+# Worker processes for parsing and feature extraction (0: run in the calling thread)
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", "0"))
+# Workers are replaced after this many tasks, so parser memory can't creep up
+CPU_POOL_MAX_TASKS_PER_CHILD = int(os.getenv("CPU_POOL_MAX_TASKS_PER_CHILD", "500"))
+
+# Run in every new worker before its first task (e.g. load NLTK data)
+_warmups: List[Callable[[], None]] = []
+
+def register_warmup(fn: Callable[[], None]) -> Callable[[], None]:
+    """Registers a module-level function to run when each worker starts."""
+    _warmups.append(fn)
+    return fn
+
+def _warm_start(warmups: List[Callable[[], None]]):
+    # Unpickling the warmups imports their modules; then each one runs
+    for fn in warmups:
+        try:
+            fn()
+        except Exception as e:
+            logger.warning(f"CPU pool warmup {fn.__qualname__} failed: {e}")
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# --- Process-wide Pool ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_stats = {"tasks": 0, "inline": 0, "failed": 0, "restarts": 0}
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Returns the shared process pool, creating it on first use (None when disabled)."""
+    global _pool
+    if CPU_POOL_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # "spawn": forking a process that runs threads (the API, job workers) isn't safe
+            _pool = ProcessPoolExecutor(
+                max_workers=CPU_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_start,
+                initargs=(list(_warmups),),
+                max_tasks_per_child=CPU_POOL_MAX_TASKS_PER_CHILD,
+            )
+            logger.info(f"CPU pool created ({CPU_POOL_WORKERS} workers).")
+        return _pool
+
+def start_pool():
+    """Creates the pool and starts every worker now, so no job waits for a warmup."""
+    pool = get_pool()
+    if pool is not None:
+        pids = {future.result() for future in [pool.submit(_ping) for _ in range(CPU_POOL_WORKERS)]}
+        logger.info(f"CPU pool started: {len(pids)} warm workers.")
+
+def shutdown_pool():
+    """Stops the worker processes (called on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def run(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs fn(*args, **kwargs) in the pool and returns its result, or runs it
+    inline when the pool is disabled. Exceptions raised by fn propagate.
+    If a worker dies, the pool is replaced and this task runs inline.
+    """
+    global _pool
+    pool = get_pool()
+    if pool is None:
+        with _pool_lock:
+            _stats["inline"] += 1
+        return fn(*args, **kwargs)
+
+    try:
+        result = pool.submit(fn, *args, **kwargs).result()
+    except BrokenProcessPool as e:
+        logger.error(f"CPU pool is broken ({e}). Restarting it and running the task inline.")
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+                _stats["restarts"] += 1
+            _stats["inline"] += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+        return fn(*args, **kwargs)
+    except Exception:
+        with _pool_lock:
+            _stats["failed"] += 1
+        raise
+
+    with _pool_lock:
+        _stats["tasks"] += 1
+    return result
+
+def pool_stats() -> Dict[str, Any]:
+    """Stats for the health endpoint. Does not start the pool."""
+    with _pool_lock:
+        return {"running": _pool is not None, "workers": CPU_POOL_WORKERS, **_stats}
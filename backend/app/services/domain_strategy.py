@@ -0,0 +1,106 @@
+# backend/app/services/domain_strategy.py
+
+import os
+import time
+import threading
+import logging
+from urllib.parse import urlparse
+from typing import Any, Dict
+
+from app.services.cache import DiskCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Scrape outcomes we learn per domain
+SIMPLE = "simple"          # requests-style fetch was enough
+PLAYWRIGHT = "playwright"  # needed the browser fallback
+FAILED = "failed"          # both methods failed in a way that blames the domain
+OUTCOMES = (SIMPLE, PLAYWRIGHT, FAILED)
+
+# Routing decisions
+STRATEGY_SIMPLE = "simple"          # try simple first, fall back if needed (the default)
+STRATEGY_PLAYWRIGHT = "playwright"  # go straight to Playwright
+STRATEGY_SKIP = "skip"              # don't bother, the domain always fails
+
+# --- Learning Settings ---
+# Older outcomes count for less: a score halves every HALF_LIFE seconds.
+HALF_LIFE = float(os.getenv("DOMAIN_STRATEGY_HALF_LIFE", str(3 * 24 * 60 * 60)))
+# A non-default strategy needs this much (decayed) evidence and share of outcomes...
+MIN_EVIDENCE = float(os.getenv("DOMAIN_STRATEGY_MIN_EVIDENCE", "2"))
+MIN_SHARE = float(os.getenv("DOMAIN_STRATEGY_MIN_SHARE", "0.75"))
+# ...and domains are re-probed with the full simple-first path at least this often.
+REPROBE_INTERVAL = float(os.getenv("DOMAIN_STRATEGY_REPROBE_INTERVAL", str(24 * 60 * 60)))
+
+_store = DiskCache("domain_strategies", ttl_seconds=30 * 24 * 60 * 60, max_entries=10000)
+_lock = threading.Lock()
+
+
+def domain_of(url: str) -> str:
+    return urlparse(url).netloc.lower().replace("www.", "", 1)
+
+def _decayed_scores(record: Dict[str, Any], now: float) -> Dict[str, float]:
+    factor = 0.5 ** (max(0.0, now - record["updated_at"]) / HALF_LIFE)
+    return {outcome: record["scores"].get(outcome, 0.0) * factor for outcome in OUTCOMES}
+
+def _strategy_for(record: Dict[str, Any], now: float) -> str:
+    if now - record.get("last_probe", 0.0) > REPROBE_INTERVAL:
+        return STRATEGY_SIMPLE
+
+    scores = _decayed_scores(record, now)
+    total = sum(scores.values())
+    best = max(scores, key=scores.get)
+    if best == SIMPLE or total == 0 or scores[best] < MIN_EVIDENCE or scores[best] / total < MIN_SHARE:
+        return STRATEGY_SIMPLE
+    return STRATEGY_PLAYWRIGHT if best == PLAYWRIGHT else STRATEGY_SKIP
+
+def is_domain_failure(status_code: int) -> bool:
+    """
+    True for failures that say something about the whole domain: no
+    response, blocking (403, 429), timeouts and server errors. A missing
+    page (404, 410, ...) only says something about that URL.
+    """
+    return status_code in (0, 403, 408, 429) or status_code >= 500
+
+def predict_strategy(url: str) -> str:
+    """Returns how this URL's domain should be scraped, based on past outcomes."""
+    entry = _store.get(domain_of(url))
+    if entry is None:
+        return STRATEGY_SIMPLE
+    return _strategy_for(entry.value, time.time())
+
+def record_outcome(url: str, outcome: str, probed: bool):
+    """
+    Records how a scrape of this URL's domain went.
+    `probed` is True when the full simple-first path was tried (this resets the re-probe timer).
+    """
+    domain = domain_of(url)
+    now = time.time()
+    with _lock:
+        entry = _store.get(domain)
+        if entry is None:
+            record = {"scores": {}, "updated_at": now, "last_probe": 0.0}
+        else:
+            record = entry.value
+
+        scores = _decayed_scores(record, now)
+        scores[outcome] += 1.0
+        record["scores"] = scores
+        record["updated_at"] = now
+        if probed:
+            record["last_probe"] = now
+        _store.set(domain, record)
+
+def strategy_table() -> Dict[str, Dict[str, Any]]:
+    """The learned per-domain table, for inspection."""
+    now = time.time()
+    table = {}
+    for domain, record, _ in _store.items():
+        table[domain] = {
+            "strategy": _strategy_for(record, now),
+            "scores": {k: round(v, 3) for k, v in _decayed_scores(record, now).items()},
+            "last_probe": record.get("last_probe", 0.0),
+            "updated_at": record["updated_at"],
+        }
+    return table
@@ -1,8 +1,10 @@
 import json
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
 from typing import List,Dict,Any,Optional
 import re
 
+# Tags dropped from the main content text (navigation and non-visible noise)
+MAIN_CONTENT_EXCLUDED_TAGS = ['nav', 'footer', 'header', 'script', 'style', 'aside']
 
 def clean_text(text:str)->str:
     """ a simple text cleaner to remove extra whitespace and newlines """
@@ -66,10 +68,27 @@ def extract_headings(soup: BeautifulSoup) -> Dict[str, List[str]]:
         pass
     return headings
 
+def _iter_visible_strings(container: Tag, excluded_tags: List[str]):
+    """
+    Yields the text strings under `container` (the same ones get_text() uses),
+    skipping any subtree rooted at one of `excluded_tags`. Does not modify the tree.
+    """
+    stack = [iter(container.children)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+        elif isinstance(child, Tag):
+            if child.name not in excluded_tags:
+                stack.append(iter(child.children))
+        elif type(child) in (NavigableString, CData):
+            yield child
+
 def extract_main_content(soup: BeautifulSoup) -> str:
     """
     Tries to find the main content, falling back to body.
-    Removes nav and footer for cleaner text.
+    Skips nav, footer, etc. for cleaner text, without removing them from the
+    soup, so one parsed tree can be shared by every extractor.
     """
     try:
         # Try <main> tag
@@ -82,11 +101,7 @@ def extract_main_content(soup: BeautifulSoup) -> str:
         if not main_content:
             return ""
 
-        # Remove common noise
-        for tag in main_content(['nav', 'footer', 'header', 'script', 'style', 'aside']):
-            tag.decompose()
-
-        return clean_text(main_content.get_text())
+        return clean_text("".join(_iter_visible_strings(main_content, MAIN_CONTENT_EXCLUDED_TAGS)))
     except Exception:
         return ""
 
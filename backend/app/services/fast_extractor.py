@@ -0,0 +1,192 @@
+# backend/app/services/fast_extractor.py
+
+import re
+import json
+import codecs
+import lxml.html
+from lxml import etree
+from typing import Any, Dict, List, Optional, Union
+
+from app.services.extractor import clean_text, MAIN_CONTENT_EXCLUDED_TAGS
+
+# BeautifulSoup's get_text() leaves out the contents of these tags
+NON_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+
+# Subtrees left out of the main content text
+CONTENT_SKIP_TAGS = frozenset(MAIN_CONTENT_EXCLUDED_TAGS) | NON_TEXT_TAGS
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset', re.IGNORECASE)
+
+
+class _TextCollector:
+    """Collects the text under one element, skipping subtrees rooted at `skip_tags`."""
+
+    __slots__ = ('root', 'skip_tags', 'skip_depth', 'parts', 'on_close')
+
+    def __init__(self, root, skip_tags, on_close):
+        self.root = root
+        self.skip_tags = skip_tags
+        self.skip_depth = 0
+        self.parts: List[str] = []
+        self.on_close = on_close
+
+
+def _sniff_encoding(html: bytes) -> Optional[str]:
+    """
+    Guesses an encoding for bytes with no declared charset.
+    libxml2 honours <meta charset>, but otherwise assumes Latin-1, which garbles UTF-8 pages.
+    """
+    if META_CHARSET_RE.search(html[:4096]):
+        return None
+    try:
+        # final=False tolerates a multi-byte character cut off by truncation
+        codecs.getincrementaldecoder('utf-8')().decode(html, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return None
+
+
+def _parse(html: Union[str, bytes], encoding: Optional[str] = None):
+    """Parses HTML with lxml. Returns None for an empty document."""
+    try:
+        if isinstance(html, bytes):
+            encoding = encoding or _sniff_encoding(html)
+            try:
+                parser = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+            except LookupError:
+                # A charset Python knows but libxml2 doesn't: fall back to sniffing
+                encoding = _sniff_encoding(html)
+                parser = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+            return lxml.html.document_fromstring(html, parser=parser)
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input with an XML encoding declaration
+            return lxml.html.document_fromstring(html.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8'))
+    except etree.ParserError:
+        return None
+
+
+def extract_all(html: Union[str, bytes], encoding: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extracts every PageData field in a single traversal of an lxml tree.
+    Returns the same values as the individual `extractor.*` functions
+    (title, meta tags, canonical, headings, main content, JSON-LD, links, image alts).
+    """
+    fields: Dict[str, Any] = {
+        "title": None,
+        "meta_description": None,
+        "meta_keywords": None,
+        "canonical_url": None,
+        "headings": {tag: [] for tag in HEADING_TAGS},
+        "main_content": "",
+        "json_ld": [],
+        "links": [],
+        "image_alt_texts": [],
+    }
+
+    root = _parse(html, encoding)
+    if root is None:
+        return fields
+
+    headings = fields["headings"]
+    links = fields["links"]
+    content: Dict[str, str] = {}  # raw text of the first <body> and first <main>
+    found_title = found_description = found_keywords = found_canonical = False
+
+    collectors: List[_TextCollector] = []
+
+    def add_text(text: Optional[str]):
+        if text:
+            for collector in collectors:
+                if collector.skip_depth == 0:
+                    collector.parts.append(text)
+
+    def start(el):
+        nonlocal found_title, found_description, found_keywords, found_canonical
+        tag = el.tag
+
+        for collector in collectors:
+            if collector.skip_depth or tag in collector.skip_tags:
+                collector.skip_depth += 1
+
+        if tag in HEADING_TAGS:
+            slot = len(headings[tag])
+            headings[tag].append("")
+            collectors.append(_TextCollector(el, NON_TEXT_TAGS, lambda text, tag=tag, slot=slot: headings[tag].__setitem__(slot, clean_text(text))))
+
+        elif tag == 'a':
+            href = el.get('href')
+            if href and not href.startswith(('#', 'javascript:')):
+                slot = len(links)
+                links.append({"text": "", "href": href})
+                collectors.append(_TextCollector(el, NON_TEXT_TAGS, lambda text, slot=slot: links[slot].__setitem__("text", clean_text(text))))
+
+        elif tag == 'img':
+            alt = el.get('alt')
+            if alt:
+                fields["image_alt_texts"].append(clean_text(alt))
+
+        elif tag == 'meta':
+            name = el.get('name')
+            if name == 'description' and not found_description:
+                found_description = True
+                fields["meta_description"] = (el.get('content') or '').strip()
+            elif name == 'keywords' and not found_keywords:
+                found_keywords = True
+                fields["meta_keywords"] = (el.get('content') or '').strip()
+
+        elif tag == 'link' and not found_canonical:
+            rel = el.get('rel') or ''
+            if rel == 'canonical' or 'canonical' in rel.split():
+                found_canonical = True
+                fields["canonical_url"] = (el.get('href') or '').strip()
+
+        elif tag == 'title' and not found_title:
+            found_title = True
+            fields["title"] = el.text if len(el) == 0 else None
+
+        elif tag == 'script' and el.get('type') == 'application/ld+json':
+            if el.text:
+                try:
+                    fields["json_ld"].append(json.loads(el.text))
+                except json.JSONDecodeError:
+                    pass
+
+        elif tag in ('body', 'main') and tag not in content:
+            content[tag] = ""
+            collectors.append(_TextCollector(el, CONTENT_SKIP_TAGS, lambda text, tag=tag: content.__setitem__(tag, text)))
+
+        add_text(el.text)
+
+    def end(el):
+        for i in range(len(collectors) - 1, -1, -1):
+            collector = collectors[i]
+            if collector.root is el:
+                del collectors[i]
+                collector.on_close("".join(collector.parts))
+            elif collector.skip_depth:
+                collector.skip_depth -= 1
+        add_text(el.tail)
+
+    # Iterative depth-first walk (comments and PIs only contribute their tail text)
+    start(root)
+    stack = [(root, iter(root))]
+    while stack:
+        el, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            end(el)
+        elif isinstance(child.tag, str):
+            start(child)
+            stack.append((child, iter(child)))
+        else:
+            add_text(child.tail)
+
+    # Prefer <main>, falling back to <body> (same as extractor.extract_main_content)
+    fields["main_content"] = clean_text(content.get('main', content.get('body', '')))
+
+    return fields
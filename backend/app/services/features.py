@@ -1,15 +1,22 @@
 # backend/app/services/features.py
 
+import os
+import re
+import hashlib
 import nltk
+import numpy as np
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
-from nltk.util import ngrams
 from sklearn.feature_extraction.text import TfidfVectorizer
-import string
 import logging
 from app.models.page_data import PageData, ExtractedFeatures # Absolute import
-from collections import Counter
-from typing import List, Dict, Any
+from app.services import ngrams
+from app.services import cpu_pool
+from app.services.idf_corpus import IDF_CORPUS_ENABLED, idf_corpus
+from app.services.cache import TTLCache
+from functools import cached_property
+from itertools import chain, repeat
+from typing import List, Dict, Any, Optional, Union
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,10 +26,11 @@ logger = logging.getLogger(__name__)
 def download_nltk_resources():
     """Downloads NLTK resources if not found."""
     try:
-        nltk.data.find('tokenizers/punkt')
+        # word_tokenize loads punkt_tab (not the pickled 'punkt') since NLTK 3.8.2
+        nltk.data.find('tokenizers/punkt_tab')
     except LookupError:
-        logger.info("Downloading NLTK 'punkt' tokenizer...")
-        nltk.download('punkt', quiet=True)
+        logger.info("Downloading NLTK 'punkt_tab' tokenizer...")
+        nltk.download('punkt_tab', quiet=True)
     try:
         nltk.data.find('corpora/stopwords')
     except LookupError:
@@ -33,30 +41,184 @@ def download_nltk_resources():
 download_nltk_resources()
 # --- End NLTK Setup ---
 
+# --- Tokenizer Settings ---
+# "regex": one precompiled pattern (default, much faster)
+# "nltk":  NLTK word_tokenize (Punkt + Treebank), the original path
+TOKENIZER = os.getenv("FEATURES_TOKENIZER", "regex")
 
-def _clean_and_tokenize(text: str) -> List[str]:
+# NLTK's English list, used if the corpus can't be loaded
+_FALLBACK_STOP_WORDS = (
+    "i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself "
+    "yourselves he him his himself she she's her hers herself it it's its itself they them their "
+    "theirs themselves what which who whom this that that'll these those am is are was were be "
+    "been being have has had having do does did doing a an the and but if or because as until "
+    "while of at by for with about against between into through during before after above below "
+    "to from up down in out on off over under again further then once here there when where why "
+    "how all any both each few more most other some such no nor not only own same so than too "
+    "very s t can will just don don't should should've now d ll m o re ve y ain aren aren't "
+    "couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't haven haven't isn isn't "
+    "ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn shouldn't wasn wasn't "
+    "weren weren't won won't wouldn wouldn't"
+).split()
+
+def _load_stop_words() -> frozenset:
+    try:
+        return frozenset(stopwords.words('english'))
+    except LookupError:
+        logger.warning("NLTK stopwords not available. Using the built-in English list.")
+        return frozenset(_FALLBACK_STOP_WORDS)
+
+# Built once; the old code rebuilt this set on every call
+STOP_WORDS = _load_stop_words()
+
+# Mirrors how NLTK's Treebank tokenizer splits words within a sentence, so
+# both paths keep the same alphabetic tokens. Characters Treebank doesn't
+# split on ("+", "=", "/", single hyphens, inner periods...) stay attached,
+# so "c++", "full-time" and "ph.d" come out whole (and are then dropped for
+# not being alphabetic); clitics keep their apostrophe ("'s", "'n").
+_TREEBANK_SPLIT = r"""\s\w'.,:;@#$%&?!*()\[\]{}<>"`«“‘„»”’‒-―-"""
+_GLUE = rf"(?:_|(?<!-)-(?!-)|[^{_TREEBANK_SPLIT}])"
+# Where Treebank would pad a clitic with a space before splitting it off
+_CLITIC_END = r"""(?=[\s,:;@#$%&?!*()\[\]{}<>"«“‘„»”’‒-―.]|$)"""
+_JOIN = rf"(?:{_GLUE}|(?<!\.)\.(?!\.)|[,:](?=\d)|(?<=\w)'(?!'|(?:s|m|d|ll|re|ve){_CLITIC_END}))"
+_LEAD = rf"(?:{_GLUE}|(?<!\.)\.(?![.\s])|(?<!')'(?=(?:re|ve|ll|m|t|s|d|n)\b))"
+_TOKEN_RE = re.compile(rf"""
+      \b(?:can(?=not\b)|gim(?=me\b)|gon(?=na\b)|got(?=ta\b)|lem(?=me\b)|wan(?=na\b)|more(?='n\b))
+    | [^\W_]+?(?=n't{_CLITIC_END})     # "can't" -> "ca" + "n't", "don't" -> "do" + "n't"
+    | n't{_CLITIC_END}
+    | {_LEAD}*[^\W_]+(?:{_JOIN}+[^\W_]+)*{_GLUE}*
+""", re.VERBOSE)
+
+
+def _clean_and_tokenize(text: str, tokenizer: Optional[str] = None) -> List[str]:
     """
     Cleans raw text:
     1. Lowercases
-    2. Tokenizes
-    3. Removes punctuation & stop words
+    2. Tokenizes (TOKENIZER: "regex" or "nltk")
+    3. Keeps alphabetic tokens that aren't stop words
     """
     if not text:
         return []
     
     text = text.lower()
-    tokens = word_tokenize(text)
-    
-    stop_words = set(stopwords.words('english'))
-    punct = set(string.punctuation)
+    if (tokenizer or TOKENIZER) == "nltk":
+        tokens = word_tokenize(text)
+    else:
+        tokens = _TOKEN_RE.findall(text)
     
+    # Punctuation is never alphabetic, so isalpha() also removes it
     cleaned_tokens = [
         word for word in tokens 
-        if word.isalpha() and word not in stop_words and word not in punct
+        if word.isalpha() and word not in STOP_WORDS
     ]
     
     return cleaned_tokens
 
+# --- Analyzed Documents ---
+# Recently analyzed texts, so the scraper's word count, the per-page
+# features and TF-IDF all share one tokenization of a page
+# The cache is per process (see cpu_pool.py). With CPU_POOL_WORKERS > 0 a
+# page's features reuse its document only if the same worker parsed it, and
+# the memory budget below applies to each worker separately.
+DOCUMENT_CACHE_TTL = float(os.getenv("FEATURES_DOCUMENT_CACHE_TTL", "600"))
+DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("FEATURES_DOCUMENT_CACHE_MAX_ENTRIES", "128"))
+# Memory budget for cached documents; a page too big for it is analyzed uncached
+DOCUMENT_CACHE_MAX_MB = float(os.getenv("FEATURES_DOCUMENT_CACHE_MAX_MB", "64"))
+# Measured: a fully built document (tokens, n-gram arrays, term counts) holds
+# about 40-45 bytes per character of text, on top of the text itself
+DOCUMENT_BYTES_PER_CHAR = 48
+
+document_cache = TTLCache(ttl_seconds=DOCUMENT_CACHE_TTL, max_entries=DOCUMENT_CACHE_MAX_ENTRIES,
+                          max_bytes=int(DOCUMENT_CACHE_MAX_MB * 1024 * 1024))
+
+
+class AnalyzedDocument:
+    """
+    One page's text, tokenized once. Every feature stage reads from this
+    instead of re-processing the text; each representation is built the
+    first time it's needed.
+    """
+
+    def __init__(self, text: Optional[str]):
+        self.text = text or ""
+
+    @classmethod
+    def from_tokens(cls, tokens: List[str]) -> "AnalyzedDocument":
+        """A document for already-cleaned tokens (it has no raw text)."""
+        doc = cls("")
+        doc.__dict__["tokens"] = list(tokens)
+        return doc
+
+    @cached_property
+    def word_count(self) -> int:
+        """Whitespace-separated words in the raw text (stop words included)."""
+        return len(self.text.split())
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Lowercased, alphabetic, non-stop-word tokens."""
+        return _clean_and_tokenize(self.text)
+
+    @cached_property
+    def _encoded(self):
+        return ngrams.encode_tokens(self.tokens)
+
+    @cached_property
+    def token_ids(self) -> np.ndarray:
+        """Tokens interned to integer ids (vocab[id] is the token)."""
+        return self._encoded[0]
+
+    @cached_property
+    def vocab(self) -> List[str]:
+        return self._encoded[1]
+
+    @cached_property
+    def ngram_counts(self) -> List[ngrams.NgramCounts]:
+        """Distinct 1-3 grams with counts and first positions."""
+        return ngrams.count_ngrams(self.token_ids, len(self.vocab), max_n=3)
+
+    @cached_property
+    def term_counts(self) -> Dict[str, int]:
+        """Every distinct 1-3 gram as a string, with its count."""
+        return ngrams.term_counts(self.tokens, self.ngram_counts)
+
+    @cached_property
+    def avg_word_length(self) -> float:
+        if not self.tokens:
+            return 0.0
+        return sum(len(word) for word in self.tokens) / len(self.tokens)
+
+    def keyword_densities(self, top_n: int = 50) -> Dict[str, float]:
+        """
+        The top_n 1-3 grams as {ngram: density %}. N-grams are counted on
+        integer ids (see ngrams.py); only the winners become strings.
+        """
+        if not self.tokens:
+            return {}
+        total_words = len(self.tokens)
+        return {
+            " ".join(self.tokens[first:first + n]): (count / total_words) * 100
+            for count, n, first in ngrams.top_ngrams(self.ngram_counts, top_n)
+        }
+
+
+def analyze(text: Optional[str]) -> AnalyzedDocument:
+    """The AnalyzedDocument for a text, shared while it's in the document cache."""
+    text = text or ""
+    key = hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+    doc = document_cache.get(key)
+    if doc is None:
+        doc = AnalyzedDocument(text)
+        document_cache.set(key, doc, size=len(text) * DOCUMENT_BYTES_PER_CHAR)
+    return doc
+
+def _as_document(document: Union[str, AnalyzedDocument]) -> AnalyzedDocument:
+    return document if isinstance(document, AnalyzedDocument) else analyze(document)
+
+def _document_terms(doc: AnalyzedDocument):
+    # The vectorizer's analyzer: every n-gram occurrence, from the shared counts
+    return chain.from_iterable(repeat(term, count) for term, count in doc.term_counts.items())
+
 def calculate_keyword_densities(tokens: List[str], top_n: int = 50) -> Dict[str, float]:
     """
     Calculates keyword density for 1, 2, and 3-grams.
@@ -64,39 +226,16 @@ def calculate_keyword_densities(tokens: List[str], top_n: int = 50) -> Dict[str,
     """
     if not tokens or len(tokens) == 0:
         return {}
+    return AnalyzedDocument.from_tokens(tokens).keyword_densities(top_n)
 
-    total_words = len(tokens)
-    densities = {}
-
-    # 1-grams
-    unigram_counts = Counter(tokens)
-    for word, count in unigram_counts.items():
-        densities[word] = (count / total_words) * 100
-
-    # 2-grams
-    bigrams = ngrams(tokens, 2)
-    bigram_counts = Counter(bigrams)
-    for bigram, count in bigram_counts.items():
-        key = " ".join(bigram)
-        densities[key] = (count / total_words) * 100
-
-    # 3-grams
-    trigrams = ngrams(tokens, 3)
-    trigram_counts = Counter(trigrams)
-    for trigram, count in trigram_counts.items():
-        key = " ".join(trigram)
-        densities[key] = (count / total_words) * 100
-        
-    # Return only the top N most frequent
-    sorted_densities = sorted(densities.items(), key=lambda item: item[1], reverse=True)
-    return dict(sorted_densities[:top_n])
-
-def calculate_tf_idf(documents: List[str], max_features: int = 100) -> Dict[str, Any]:
+def calculate_tf_idf(documents: List[Union[str, AnalyzedDocument]], max_features: int = 100, top_k: Optional[int] = 20) -> Dict[str, Any]:
     """
     Calculates TF-IDF for a list of documents (e.g., 4 course pages).
     
     Args:
         documents: A list of raw text strings [doc1_content, doc2_content, ...]
+            or AnalyzedDocuments (their tokens are reused)
+        top_k: Terms kept per document (None keeps every non-zero term)
         
     Returns:
         A dictionary:
@@ -112,30 +251,19 @@ def calculate_tf_idf(documents: List[str], max_features: int = 100) -> Dict[str,
         return {"doc_scores": [], "top_terms": []}
 
     try:
+        # The documents' own 1-3 gram counts; nothing is re-tokenized
         vectorizer = TfidfVectorizer(
-            tokenizer=_clean_and_tokenize,
-            stop_words=stopwords.words('english'),
-            ngram_range=(1, 3), 
+            analyzer=_document_terms,
             max_features=max_features
         )
         
-        tfidf_matrix = vectorizer.fit_transform(documents)
+        tfidf_matrix = vectorizer.fit_transform([_as_document(d) for d in documents]).tocsr()
         feature_names = vectorizer.get_feature_names_out()
         
-        all_doc_scores = []
-        
-        for doc_index in range(tfidf_matrix.shape[0]):
-            doc_scores = []
-            scores = tfidf_matrix.toarray()[doc_index]
-            for score_index, score in enumerate(scores):
-                if score > 0:
-                    doc_scores.append({
-                        "term": feature_names[score_index],
-                        "score": round(score, 4)
-                    })
-            
-            doc_scores.sort(key=lambda x: x['score'], reverse=True)
-            all_doc_scores.append(doc_scores)
+        all_doc_scores = [
+            _top_terms(tfidf_matrix, doc_index, feature_names, top_k)
+            for doc_index in range(tfidf_matrix.shape[0])
+        ]
             
         return {"doc_scores": all_doc_scores, "top_terms": list(feature_names)}
 
@@ -146,42 +274,174 @@ def calculate_tf_idf(documents: List[str], max_features: int = 100) -> Dict[str,
         logger.error(f"Error in TF-IDF calculation: {e}")
         return {"doc_scores": [[] for _ in documents], "top_terms": []}
 
+def _top_terms(matrix, row: int, feature_names, top_k: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    The highest-scoring terms of one CSR row, read straight from its
+    non-zero entries (the matrix is never densified).
+    """
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    indices = matrix.indices[start:end]
+    scores = np.round(matrix.data[start:end], 4)
+    return [{"term": feature_names[indices[i]], "score": float(scores[i])} for i in _rank(scores, indices, top_k)]
 
-def extract_features_from_page(page_data: PageData) -> ExtractedFeatures:
+def _rank(scores: np.ndarray, tiebreak: np.ndarray, top_k: Optional[int]) -> np.ndarray:
     """
-    Main function to extract all features from a single PageData object.
-    Note: TF-IDF is not calculated here as it requires *all* documents.
+    Positions of the top_k scores, best first; equal scores are ordered by
+    `tiebreak`. Only the entries at or above the k-th best score are sorted.
     """
-    logger.info(f"Extracting features for {page_data.url}")
-    
-    main_content = page_data.main_content or ""
-    tokens = _clean_and_tokenize(main_content)
-    
-    # Keyword Densities
-    densities = calculate_keyword_densities(tokens, top_n=50)
-    
-    # Simple Metrics
-    avg_word_len = 0.0
-    if tokens:
-        avg_word_len = sum(len(word) for word in tokens) / len(tokens)
-    
-    # Schema Types
+    positions = np.arange(len(scores))
+    if top_k is not None and len(scores) > top_k:
+        if top_k <= 0:
+            return positions[:0]
+        # Everything scoring at least the k-th best, so ties at the cut-off sort like the rest
+        cutoff = -np.partition(-scores, top_k - 1)[top_k - 1]
+        positions = positions[scores >= cutoff]
+    return positions[np.lexsort((tiebreak[positions], -scores[positions]))][:top_k]
+
+def _vocabulary(all_terms: List[Dict[str, int]], max_features: Optional[int]) -> List[str]:
+    """
+    The terms calculate_tf_idf would keep: the max_features most frequent
+    across all documents, sorted. Ties at the cut-off are broken the way
+    sklearn breaks them (the same argsort of counts in alphabetical order).
+    """
+    totals: Dict[str, int] = {}
+    for terms in all_terms:
+        for term, count in terms.items():
+            totals[term] = totals.get(term, 0) + count
+    names = sorted(totals)
+    if max_features is None or len(names) <= max_features:
+        return names
+    counts = np.fromiter((totals[name] for name in names), dtype=np.int64, count=len(names))
+    keep = np.sort(np.argsort(-counts)[:max_features])
+    return [names[i] for i in keep]
+
+def calculate_corpus_tf_idf(urls: List[str], documents: List[Union[str, AnalyzedDocument]],
+                            max_features: Optional[int] = 100, top_k: Optional[int] = 20) -> Dict[str, Any]:
+    """
+    TF-IDF against the persistent corpus of every analyzed page (see
+    idf_corpus.py) instead of just these documents. Each document is added
+    to the corpus first (all of its terms), then scored in time linear in
+    its length. Same weighting and max_features vocabulary as
+    calculate_tf_idf: smoothed IDF, raw counts, L2 norm.
+
+    Returns {"doc_scores": [...], "top_terms": [...]} like calculate_tf_idf.
+    Falls back to calculate_tf_idf if the corpus can't be used.
+    """
+    try:
+        all_terms = [_as_document(d).term_counts for d in documents]
+        for url, terms in zip(urls, all_terms):
+            if terms:
+                idf_corpus.add_document(url, terms)
+
+        vocabulary = _vocabulary(all_terms, max_features)
+        kept = set(vocabulary)
+        all_doc_scores = []
+        for terms in all_terms:
+            terms = {term: count for term, count in terms.items() if term in kept}
+            if not terms:
+                all_doc_scores.append([])
+                continue
+            names = np.array(list(terms))
+            total_documents, df = idf_corpus.document_frequencies(names)
+            weights = np.fromiter(terms.values(), dtype=np.float64, count=len(terms))
+            weights *= np.log((1 + total_documents) / (1 + df)) + 1
+            scores = np.round(weights / np.linalg.norm(weights), 4)
+            all_doc_scores.append([
+                {"term": str(names[i]), "score": float(scores[i])} for i in _rank(scores, names, top_k)
+            ])
+        return {"doc_scores": all_doc_scores, "top_terms": vocabulary}
+
+    except Exception as e:
+        logger.error(f"Corpus TF-IDF failed: {e}. Using per-job TF-IDF.")
+        return calculate_tf_idf(documents, max_features=max_features, top_k=top_k)
+
+
+def _schema_types(json_ld: Optional[List[Dict[str, Any]]]) -> List[str]:
+    """The unique schema.org @types in a page's JSON-LD."""
     schema_types = []
-    if page_data.json_ld:
-        for schema in page_data.json_ld:
+    if json_ld:
+        for schema in json_ld:
             if isinstance(schema, dict) and '@type' in schema:
                 schema_type = schema.get('@type')
                 if isinstance(schema_type, list):
                     schema_types.extend(schema_type)
                 elif isinstance(schema_type, str):
                     schema_types.append(schema_type)
+    return list(set(schema_types)) # Get unique types
+
+def extract_features_from_page(page_data: PageData, doc: Optional[AnalyzedDocument] = None) -> ExtractedFeatures:
+    """
+    Main function to extract all features from a single PageData object.
+    `doc` is the page's AnalyzedDocument (looked up by content if not given).
+    Note: TF-IDF is not calculated here as it requires *all* documents.
+    """
+    logger.info(f"Extracting features for {page_data.url}")
+    
+    if doc is None:
+        doc = analyze(page_data.main_content)
     
     features = ExtractedFeatures(
         url=str(page_data.url),
         word_count=page_data.word_count,
-        keyword_densities=densities,
-        avg_word_length=round(avg_word_len, 2),
-        schema_types_present=list(set(schema_types)) # Get unique types
+        keyword_densities=doc.keyword_densities(top_n=50),
+        avg_word_length=round(doc.avg_word_length, 2),
+        schema_types_present=_schema_types(page_data.json_ld)
     )
     
-    return features
\ No newline at end of file
+    return features
+
+
+def _text_features(urls: List[str], texts: List[str], top_k: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Keyword densities, average word length and TF-IDF distinctive terms for
+    one job's page texts. Runs in the CPU pool when it's enabled: strings
+    in, small dicts out. Each text is tokenized once.
+    """
+    docs = [analyze(text) for text in texts]
+    scored = [i for i, doc in enumerate(docs) if doc.text]
+    # IDF from every page analyzed so far, or from just this job's pages
+    if IDF_CORPUS_ENABLED:
+        tfidf = calculate_corpus_tf_idf([urls[i] for i in scored], [docs[i] for i in scored], top_k=top_k)
+    else:
+        tfidf = calculate_tf_idf([docs[i] for i in scored], top_k=top_k)
+    distinctive = dict(zip(scored, tfidf["doc_scores"]))
+
+    return [{
+        "keyword_densities": doc.keyword_densities(top_n=50),
+        "avg_word_length": round(doc.avg_word_length, 2),
+        "distinctive_terms": distinctive.get(i, []),
+    } for i, doc in enumerate(docs)]
+
+def extract_job_features(pages: List[PageData], top_k: Optional[int] = 20) -> List[ExtractedFeatures]:
+    """
+    Features for all of a job's pages, including their TF-IDF distinctive
+    terms. The text work runs in the CPU pool when it's enabled (see
+    cpu_pool.py); only page texts go in and compact results come back.
+    Pages that failed to scrape get empty placeholders.
+    """
+    scraped = [i for i, page in enumerate(pages) if not page.error]
+    for i in scraped:
+        logger.info(f"Extracting features for {pages[i].url}")
+    results = cpu_pool.run(
+        _text_features,
+        [str(pages[i].url) for i in scraped],
+        [pages[i].main_content or "" for i in scraped],
+        top_k
+    )
+
+    all_features = [ExtractedFeatures(url=str(page.url), word_count=0) for page in pages]
+    for i, result in zip(scraped, results):
+        all_features[i] = ExtractedFeatures(
+            url=str(pages[i].url),
+            word_count=pages[i].word_count,
+            schema_types_present=_schema_types(pages[i].json_ld),
+            **result
+        )
+    return all_features
+
+
+@cpu_pool.register_warmup
+def _warm_up():
+    # Importing this module loads the NLTK stop words; this loads the
+    # tokenizer (Punkt, if FEATURES_TOKENIZER=nltk) before the first job
+    _clean_and_tokenize("Warm up the tokenizer, isn't it?")
@@ -0,0 +1,191 @@
+# backend/app/services/http_client.py
+
+import os
+import socket
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+import httpcore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Pool Settings ---
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "4"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "300"))
+
+# HTTP/2 needs the optional 'h2' package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1" and HTTP2_AVAILABLE
+
+
+class DNSCache:
+    """Caches getaddrinfo() results per (host, port) for `ttl_seconds`."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, int], Tuple[List[str], float]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        """Returns the IP addresses for host, resolving at most once per TTL."""
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (time.time() - entry[1]) < self.ttl_seconds:
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+
+        with self._lock:
+            self._entries[key] = (addresses, time.time())
+        return addresses
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+dns_cache = DNSCache(DNS_CACHE_TTL)
+
+
+class _CachingDNSBackend(httpcore.SyncBackend):
+    """
+    httpcore network backend that connects via the DNS cache.
+    TLS still uses the original hostname for SNI and certificate checks.
+    """
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = dns_cache.resolve(host, port)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(str(e)) from e
+
+        last_error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                last_error = e
+        raise last_error or httpcore.ConnectError(f"No addresses for {host}")
+
+
+class _PooledTransport(httpx.HTTPTransport):
+    """
+    The standard httpx transport, with its connection pool using the caching
+    DNS backend. Takes the same arguments as httpx.HTTPTransport.
+    """
+
+    def __init__(self, verify: Any = True, cert: Any = None, trust_env: bool = True,
+                 http1: bool = True, http2: bool = False, limits: httpx.Limits = httpx.Limits(),
+                 proxy: Any = None, uds: Optional[str] = None, local_address: Optional[str] = None,
+                 retries: int = 0, socket_options: Any = None):
+        if proxy is not None:
+            # The proxy resolves hostnames, so there's nothing to cache
+            super().__init__(verify=verify, cert=cert, trust_env=trust_env, http1=http1, http2=http2,
+                             limits=limits, proxy=proxy, uds=uds, local_address=local_address,
+                             retries=retries, socket_options=socket_options)
+            return
+        # Built here instead of by HTTPTransport.__init__, which has no way to
+        # pass a network backend; the pool is configured the same way
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify, cert=cert, trust_env=trust_env),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=http1,
+            http2=http2,
+            uds=uds,
+            local_address=local_address,
+            retries=retries,
+            socket_options=socket_options,
+            network_backend=_CachingDNSBackend(),
+        )
+
+    @property
+    def open_connections(self) -> int:
+        return len(self._pool.connections)
+
+
+# --- Process-wide Client ---
+
+_client: Optional[httpx.Client] = None
+_transport: Optional[_PooledTransport] = None
+_client_lock = threading.Lock()
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_request_count = 0
+
+def get_client() -> httpx.Client:
+    """Returns the shared keep-alive client, creating it on first use."""
+    global _client, _transport
+    with _client_lock:
+        if _client is None:
+            limits = httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            )
+            _transport = _PooledTransport(http2=HTTP2_ENABLED, limits=limits)
+            _client = httpx.Client(transport=_transport, follow_redirects=True)
+            logger.info(f"HTTP client created (http2={HTTP2_ENABLED}, max_connections={MAX_CONNECTIONS}).")
+        return _client
+
+def close_client():
+    """Closes the shared client and its pooled connections (called on app shutdown)."""
+    global _client, _transport
+    with _client_lock:
+        client, _client, _transport = _client, None, None
+    if client is not None:
+        client.close()
+        logger.info("HTTP client closed.")
+
+def _get_host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _client_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_semaphores[host]
+
+@contextmanager
+def stream(method: str, url: str, **kwargs) -> Iterator[httpx.Response]:
+    """
+    Sends a streamed request on the shared client.
+    At most MAX_CONNECTIONS_PER_HOST requests run against one host at a time.
+    """
+    global _request_count
+    client = get_client()
+    with _get_host_semaphore(url):
+        with _client_lock:
+            _request_count += 1
+        with client.stream(method, url, **kwargs) as response:
+            yield response
+
+def client_stats() -> Dict[str, Any]:
+    """Stats for the health endpoint."""
+    with _client_lock:
+        transport = _transport
+        requests_sent = _request_count
+    return {
+        "running": transport is not None,
+        "http2": HTTP2_ENABLED,
+        "requests": requests_sent,
+        "open_connections": transport.open_connections if transport else 0,
+        "dns_cache": dns_cache.stats(),
+    }
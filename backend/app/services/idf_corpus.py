@@ -0,0 +1,252 @@
+# backend/app/services/idf_corpus.py
+#
+# Document frequencies over every page we've analyzed, so TF-IDF can use
+# corpus-wide IDF instead of the handful of pages in one job.
+#
+# Terms are hashed into a fixed number of buckets (the hashing trick, with the
+# same murmurhash3 as sklearn's HashingVectorizer), so there is no vocabulary
+# to grow and nothing to refit. The counts live in a memory-mapped .npy file
+# that any process can open instantly. A SQLite table records the hashes each
+# page contributed, so a re-scraped page replaces its old counts, and
+# compaction can drop old pages and rebuild the counts from scratch.
+#
+# Compact by hand with:  python -m app.services.idf_corpus
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+import numpy as np
+from sklearn.utils import murmurhash3_32
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.services.cache import CACHE_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Corpus Settings ---
+# Score pages against the persistent corpus ("0": per-job TF-IDF only)
+IDF_CORPUS_ENABLED = os.getenv("IDF_CORPUS", "1") == "1"
+IDF_CORPUS_DIR = os.getenv("IDF_CORPUS_DIR", os.path.join(CACHE_DIR, "idf_corpus"))
+# 2^20 buckets: a 4 MB counts file with few collisions for 1-3 grams
+IDF_HASH_BITS = int(os.getenv("IDF_HASH_BITS", "20"))
+# Compaction drops pages not seen for IDF_MAX_AGE and the oldest beyond
+# IDF_MAX_DOCUMENTS; it runs after every IDF_COMPACT_EVERY pages added by one
+# process (each API, job or CPU pool worker process keeps its own count).
+IDF_MAX_AGE = float(os.getenv("IDF_MAX_AGE", str(180 * 24 * 60 * 60)))
+IDF_MAX_DOCUMENTS = int(os.getenv("IDF_MAX_DOCUMENTS", "100000"))
+IDF_COMPACT_EVERY = int(os.getenv("IDF_COMPACT_EVERY", "1000"))
+
+
+def term_hashes(terms: Iterable[str]) -> np.ndarray:
+    """Stable (process-independent) 32-bit hashes of terms."""
+    return np.array([murmurhash3_32(term, positive=True) for term in terms], dtype=np.uint32)
+
+
+class IDFCorpus:
+    """
+    Incremental document frequencies over hashed terms.
+
+    counts[0] is the number of documents; counts[1 + bucket] is how many
+    of them contain a term in that bucket. Writers serialize on the SQLite
+    write lock, so the API and worker processes can all add pages.
+    """
+
+    def __init__(self, directory: str = IDF_CORPUS_DIR, hash_bits: int = IDF_HASH_BITS,
+                 max_age: float = IDF_MAX_AGE, max_documents: int = IDF_MAX_DOCUMENTS,
+                 compact_every: int = IDF_COMPACT_EVERY):
+        self.directory = directory
+        self.buckets = 1 << hash_bits
+        self.max_age = max_age
+        self.max_documents = max_documents
+        self.compact_every = compact_every
+        self.counts_path = os.path.join(directory, f"df_{hash_bits}.npy")
+        self.db_path = os.path.join(directory, "documents.sqlite3")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._counts: Optional[np.ndarray] = None
+        self._inode: Optional[int] = None
+        self._lock = threading.Lock()
+        self._added_since_compact = 0
+        self._stats = {"added": 0, "replaced": 0, "unchanged": 0, "compactions": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing a module never touches the disk.
+        # Autocommit mode, so writes can use explicit BEGIN IMMEDIATE transactions.
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, "
+                "hashes BLOB NOT NULL, added_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_added_at ON documents (added_at)")
+        return self._conn
+
+    def _load_counts(self) -> np.ndarray:
+        """The memory-mapped counts, reopened if compaction replaced the file."""
+        try:
+            inode = os.stat(self.counts_path).st_ino
+        except FileNotFoundError:
+            # First use (or a new IDF_HASH_BITS): build from the documents table
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not os.path.exists(self.counts_path):
+                    self._write_counts(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            inode = os.stat(self.counts_path).st_ino
+        if inode != self._inode:
+            self._counts = np.load(self.counts_path, mmap_mode="r+")
+            self._inode = inode
+        return self._counts
+
+    def _write_counts(self, conn: sqlite3.Connection):
+        """Rebuilds the counts file from the documents table (call inside a write transaction)."""
+        counts = np.zeros(self.buckets + 1, dtype=np.uint32)
+        for (blob,) in conn.execute("SELECT hashes FROM documents"):
+            counts[1 + self._bucket_ids(np.frombuffer(blob, dtype=np.uint32))] += 1
+            counts[0] += 1
+        # Written aside and swapped in, so readers never see a partial file
+        tmp_path = f"{self.counts_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, counts)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.counts_path)
+
+    def _bucket_ids(self, hashes: np.ndarray) -> np.ndarray:
+        # Distinct buckets: a document counts once per bucket, even on collisions
+        return np.unique(hashes % self.buckets)
+
+    def add_document(self, url: str, terms: Iterable[str]) -> bool:
+        """
+        Adds (or replaces) a page's distinct terms. Returns False if the page
+        was already in the corpus with the same terms.
+        """
+        hashes = np.unique(term_hashes(terms))
+        content_hash = hashlib.sha1(hashes.tobytes()).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            counts = self._load_counts()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have compacted while we waited for the lock
+                self._load_counts()
+                row = conn.execute("SELECT content_hash, hashes FROM documents WHERE url = ?", (url,)).fetchone()
+                if row is not None and row[0] == content_hash:
+                    conn.execute("UPDATE documents SET added_at = ? WHERE url = ?", (time.time(), url))
+                    conn.execute("COMMIT")
+                    self._stats["unchanged"] += 1
+                    return False
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (url, content_hash, hashes, added_at) VALUES (?, ?, ?, ?)",
+                    (url, content_hash, hashes.tobytes(), time.time())
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            committed_inode = self._inode
+
+            # The counts only change once the page is committed (a crash in
+            # between is repaired by the next compaction). The write lock
+            # still serializes them with other processes' updates.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                counts = self._load_counts()
+                # If another process compacted in between, its rebuild already counted this page
+                if self._inode == committed_inode:
+                    if row is not None:
+                        old = 1 + self._bucket_ids(np.frombuffer(row[1], dtype=np.uint32))
+                        counts[old] = np.maximum(counts[old], 1) - 1
+                    else:
+                        counts[0] += 1
+                    counts[1 + self._bucket_ids(hashes)] += 1
+                    counts.flush()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._stats["replaced" if row is not None else "added"] += 1
+            self._added_since_compact += 1
+            compact = self._added_since_compact >= self.compact_every
+        if compact:
+            self.compact()
+        return True
+
+    def document_frequencies(self, terms: Iterable[str]) -> Tuple[int, np.ndarray]:
+        """(number of documents, document frequency of each term)."""
+        with self._lock:
+            counts = self._load_counts()
+        return int(counts[0]), counts[1 + term_hashes(terms) % self.buckets].astype(np.int64)
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Drops pages older than max_age and the oldest beyond max_documents,
+        then rebuilds the counts from what's left (also repairing any drift
+        from a crash between a commit and its counts update).
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = conn.execute(
+                    "DELETE FROM documents WHERE added_at < ?", (time.time() - self.max_age,)
+                ).rowcount
+                overflow = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] - self.max_documents
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM documents WHERE url IN "
+                        "(SELECT url FROM documents ORDER BY added_at ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                self._write_counts(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._load_counts()
+            self._added_since_compact = 0
+            self._stats["compactions"] += 1
+            removed = expired + max(0, overflow)
+        logger.info(f"IDF corpus compacted: removed {removed} documents, {int(self._counts[0])} remain.")
+        return {"removed": removed, "documents": int(self._counts[0])}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._counts = None
+            self._inode = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Stats for the health endpoint. Read-only: never creates the corpus."""
+        with self._lock:
+            # Compaction swaps the file in place, so once it exists it never goes away
+            documents = int(self._load_counts()[0]) if os.path.exists(self.counts_path) else 0
+            return {
+                "enabled": IDF_CORPUS_ENABLED,
+                "documents": documents,
+                "buckets": self.buckets,
+                **self._stats,
+            }
+
+
+# --- Process-wide Corpus ---
+
+idf_corpus = IDFCorpus()
+
+
+if __name__ == "__main__":
+    print(idf_corpus.compact())
+    print(idf_corpus.stats())
@@ -0,0 +1,381 @@
+# backend/app/services/job_queue.py
+
+import os
+import json
+import math
+import time
+import socket
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.services.cache import CACHE_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Scheduler Settings ---
+# "local":  jobs run in the API process that accepted them (default, single worker)
+# "sqlite": jobs go into a shared SQLite queue that any API or worker process
+#           on the host can take from (run `python -m app.worker` for extra executors)
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE", "local")
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(CACHE_DIR, "job_queue.sqlite3"))
+# Workflows running at once per process (each one scrapes, renders and calls the LLM)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs allowed to wait for a worker; beyond this /analyze answers 429
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "20"))
+# Assumed workflow duration until we've measured some
+DEFAULT_JOB_SECONDS = float(os.getenv("JOB_DEFAULT_SECONDS", "60"))
+# SQLite backend: how often idle workers look for new jobs, and how long a
+# claim may go without a heartbeat before its worker is assumed dead and the
+# job is requeued (running jobs are refreshed every third of that)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_CLAIM_TIMEOUT = float(os.getenv("JOB_CLAIM_TIMEOUT", str(5 * 60)))
+
+# Runs one job: handler(job_id, **payload)
+JobHandler = Callable[..., Any]
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full. Retry after {retry_after}s.")
+        self.retry_after = retry_after
+
+
+class _WorkerPool(ABC):
+    """
+    The worker threads and bookkeeping shared by both queue backends.
+    Subclasses store the jobs and implement _next_job / _finish_job.
+    """
+
+    backend = ""
+
+    def __init__(self, workers: int, max_queued: int):
+        self.workers = max(1, workers)
+        self.max_queued = max(0, max_queued)
+        self._handler: Optional[JobHandler] = None
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._avg_seconds: Optional[float] = None
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0}
+
+    def start(self, handler: JobHandler):
+        """Starts the worker threads, which run `handler(job_id, **payload)` for each job."""
+        with self._lock:
+            if self._threads:
+                return
+            self._handler = handler
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Job queue ({self.backend}) started with {self.workers} workers (max {self.max_queued} queued).")
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stops the workers after their current job."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stopping.set()
+        self._wake_all()
+        for thread in threads:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                **self._stats,
+                "backend": self.backend,
+                "workers": self.workers if self._threads else 0,
+                "running_here": self._running,
+                "max_queued": self.max_queued,
+                "avg_job_seconds": round(self._avg_seconds, 1) if self._avg_seconds else None,
+            }
+        stats.update(self._queue_counts())
+        return stats
+
+    def _retry_after(self) -> int:
+        # Roughly when the next queue slot frees up: one job's duration spread over the workers
+        avg = self._avg_seconds or DEFAULT_JOB_SECONDS
+        return max(1, math.ceil(avg / self.workers))
+
+    def _reject(self):
+        with self._lock:
+            self._stats["rejected"] += 1
+        raise QueueFull(self._retry_after())
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            job = self._next_job()
+            if job is None:
+                continue
+            job_id, payload = job
+            with self._lock:
+                self._running += 1
+
+            started = time.monotonic()
+            try:
+                self._handler(job_id, **payload)
+            except Exception as e:
+                logger.error(f"Job {job_id}: Unhandled error in worker. Error: {e}")
+            finally:
+                self._finish_job(job_id)
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self._running -= 1
+                    self._stats["completed"] += 1
+                    # Moving average of job duration, for Retry-After
+                    self._avg_seconds = elapsed if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    @abstractmethod
+    def _next_job(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Blocks briefly for the next job. Returns None if there was none (or we're stopping)."""
+
+    def _finish_job(self, job_id: str):
+        pass
+
+    def _wake_all(self):
+        pass
+
+    @abstractmethod
+    def _queue_counts(self) -> Dict[str, int]:
+        """Jobs waiting and running across the whole queue."""
+
+
+class JobQueue(_WorkerPool):
+    """
+    A bounded in-process FIFO of jobs run by a fixed number of worker threads.
+    Jobs beyond `max_queued` are rejected rather than started, so a burst
+    of requests can't start an unbounded number of workflows at once.
+    """
+
+    backend = "local"
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE):
+        super().__init__(workers, max_queued)
+        self._pending: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        self._cond = threading.Condition()
+
+    def submit(self, job_id: str, payload: Dict[str, Any]):
+        """
+        Queues a job for the workers.
+        Raises QueueFull (with a suggested retry delay) when the queue is at capacity.
+        """
+        with self._cond:
+            if len(self._pending) >= self.max_queued:
+                full = True
+            else:
+                full = False
+                self._pending.append((job_id, payload))
+                self._cond.notify()
+        if full:
+            self._reject()
+        with self._lock:
+            self._stats["submitted"] += 1
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it isn't waiting."""
+        with self._cond:
+            for i, (queued_id, _) in enumerate(self._pending):
+                if queued_id == job_id:
+                    return i + 1
+        return None
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stops the workers after their current job. Queued jobs are dropped."""
+        super().shutdown(timeout)
+        with self._cond:
+            dropped = len(self._pending)
+            self._pending.clear()
+        if dropped:
+            logger.warning(f"Job queue shut down with {dropped} jobs still queued.")
+
+    def _next_job(self):
+        with self._cond:
+            while not self._pending and not self._stopping.is_set():
+                self._cond.wait()
+            if self._stopping.is_set():
+                return None
+            return self._pending.popleft()
+
+    def _wake_all(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _queue_counts(self) -> Dict[str, int]:
+        with self._cond:
+            queued = len(self._pending)
+        with self._lock:
+            return {"queued": queued, "running": self._running}
+
+
+class SQLiteJobQueue(_WorkerPool):
+    """
+    A bounded FIFO of jobs in a SQLite file shared by every process on the
+    host. API processes submit jobs; API and worker processes claim them.
+    While a process runs jobs, a heartbeat thread keeps its claims fresh; a
+    claim not refreshed for JOB_CLAIM_TIMEOUT (its worker crashed) is requeued.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE,
+                 poll_interval: float = JOB_POLL_INTERVAL, claim_timeout: float = JOB_CLAIM_TIMEOUT):
+        super().__init__(workers, max_queued)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing a module never touches the disk.
+        # Autocommit mode, so claims can use explicit BEGIN IMMEDIATE transactions.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS queue ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT UNIQUE NOT NULL, "
+                "payload TEXT NOT NULL, enqueued_at REAL NOT NULL, "
+                "claimed_by TEXT, claimed_at REAL)"
+            )
+        return self._conn
+
+    def start(self, handler: JobHandler):
+        """Starts the worker threads and the heartbeat that keeps their claims alive."""
+        super().start(handler)
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stops the workers after their current job, then the heartbeat."""
+        super().shutdown(timeout)
+        with self._lock:
+            heartbeat, self._heartbeat = self._heartbeat, None
+        if heartbeat is not None:
+            heartbeat.join(timeout)
+
+    def submit(self, job_id: str, payload: Dict[str, Any]):
+        """
+        Queues a job for any worker on the host.
+        Raises QueueFull (with a suggested retry delay) when the queue is at capacity.
+        """
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                waiting = conn.execute("SELECT COUNT(*) FROM queue WHERE claimed_by IS NULL").fetchone()[0]
+                full = waiting >= self.max_queued
+                if not full:
+                    conn.execute(
+                        "INSERT INTO queue (job_id, payload, enqueued_at) VALUES (?, ?, ?)",
+                        (job_id, json.dumps(payload), time.time())
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if full:
+            self._reject()
+        with self._lock:
+            self._stats["submitted"] += 1
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it isn't waiting."""
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM queue WHERE claimed_by IS NULL AND seq <= "
+                "(SELECT seq FROM queue WHERE job_id = ? AND claimed_by IS NULL)",
+                (job_id,)
+            ).fetchone()
+        return row[0] or None
+
+    def _next_job(self):
+        job = self._claim()
+        if job is None:
+            self._stopping.wait(self.poll_interval)
+        return job
+
+    def _claim(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        now = time.time()
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                requeued = conn.execute(
+                    "UPDATE queue SET claimed_by = NULL, claimed_at = NULL "
+                    "WHERE claimed_by IS NOT NULL AND claimed_at < ?",
+                    (now - self.claim_timeout,)
+                ).rowcount
+                row = conn.execute(
+                    "SELECT seq, job_id, payload FROM queue WHERE claimed_by IS NULL ORDER BY seq LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE queue SET claimed_by = ?, claimed_at = ? WHERE seq = ?",
+                        (self.worker_id, now, row[0])
+                    )
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                logger.error(f"Job queue claim failed. Error: {e}")
+                return None
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs whose workers stopped responding.")
+        if row is None:
+            return None
+        return row[1], json.loads(row[2])
+
+    def _heartbeat_loop(self):
+        while not self._stopping.wait(self.claim_timeout / 3):
+            self._refresh_claims()
+
+    def _refresh_claims(self):
+        # Our claims stay younger than claim_timeout for as long as this process is alive
+        try:
+            with self._db_lock:
+                self._connect().execute(
+                    "UPDATE queue SET claimed_at = ? WHERE claimed_by = ?", (time.time(), self.worker_id)
+                )
+        except Exception as e:
+            logger.error(f"Job queue heartbeat failed. Error: {e}")
+
+    def _finish_job(self, job_id: str):
+        try:
+            with self._db_lock:
+                self._connect().execute("DELETE FROM queue WHERE job_id = ?", (job_id,))
+        except Exception as e:
+            logger.error(f"Job {job_id}: Could not remove finished job from the queue. Error: {e}")
+
+    def _queue_counts(self) -> Dict[str, int]:
+        with self._db_lock:
+            queued, running = self._connect().execute(
+                "SELECT COUNT(*) - COUNT(claimed_by), COUNT(claimed_by) FROM queue"
+            ).fetchone()
+        return {"queued": queued or 0, "running": running or 0}
+
+
+def create_job_queue(backend: str = JOB_QUEUE_BACKEND):
+    """Returns a job queue for the configured backend ("local" or "sqlite")."""
+    if backend == "sqlite":
+        return SQLiteJobQueue()
+    return JobQueue()
+
+
+# --- Process-wide Queue ---
+
+job_queue = create_job_queue()
@@ -0,0 +1,224 @@
+# backend/app/services/job_store.py
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.models.api_models import ReportStatusResponse
+from app.services.cache import CACHE_DIR, TTLCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Store Settings ---
+# "sqlite": durable, shared by every worker process on the host (default)
+# "memory": per-process, lost on restart (handy for tests and single-worker dev)
+JOB_STORE_BACKEND = os.getenv("JOB_STORE", "sqlite")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+# Jobs are forgotten this long after their last update, and the oldest
+# are dropped beyond JOB_MAX_ENTRIES, so the store stays bounded.
+JOB_TTL = float(os.getenv("JOB_TTL", str(7 * 24 * 60 * 60)))
+JOB_MAX_ENTRIES = int(os.getenv("JOB_MAX_ENTRIES", "10000"))
+
+
+class MemoryJobStore:
+    """
+    Jobs held in a TTL/LRU cache in this process.
+    Bounded, but not shared between workers and lost on restart.
+    """
+
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: float = JOB_TTL, max_entries: int = JOB_MAX_ENTRIES):
+        self._jobs = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._events = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str) -> ReportStatusResponse:
+        job = ReportStatusResponse(job_id=job_id, status="PENDING")
+        self._jobs.set(job_id, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportStatusResponse]:
+        job = self._jobs.get(job_id)
+        return job.model_copy() if job is not None else None
+
+    def update(self, job_id: str, **fields: Any):
+        """Sets fields (status, report, error) on a job. Unknown jobs are ignored."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                logger.warning(f"Job {job_id}: Update for unknown or expired job ignored.")
+                return
+            self._jobs.set(job_id, job.model_copy(update=fields))
+
+    def delete(self, job_id: str):
+        self._jobs.delete(job_id)
+        self._events.delete(job_id)
+
+    def add_event(self, job_id: str, event: str, data: Dict[str, Any]):
+        """Appends a progress event to the job's event log."""
+        with self._lock:
+            events = self._events.get(job_id) or []
+            events.append({"seq": len(events) + 1, "event": event, "data": data, "at": time.time()})
+            self._events.set(job_id, events)
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """The job's events with seq > `after`, oldest first."""
+        with self._lock:
+            events = self._events.get(job_id) or []
+            return [dict(e) for e in events if e["seq"] > after]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, **self._jobs.stats()}
+
+
+class SQLiteJobStore:
+    """
+    Jobs persisted in SQLite, so results survive restarts and any
+    uvicorn worker can answer a poll. Reports are written once, when the
+    job finishes, and only read back when a client asks for them.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = JOB_DB_PATH, ttl_seconds: float = JOB_TTL, max_entries: int = JOB_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"pruned": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing a module never touches the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Other worker processes write to the same file; wait for their locks
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "report TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, "
+                "data TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (job_id, seq))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def create(self, job_id: str) -> ReportStatusResponse:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, "PENDING", now, now)
+            )
+            self._prune(conn, now)
+            conn.commit()
+        return ReportStatusResponse(job_id=job_id, status="PENDING")
+
+    def get(self, job_id: str) -> Optional[ReportStatusResponse]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT status, report, error, updated_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None or (time.time() - row[3]) > self.ttl_seconds:
+            return None
+        status, report, error, _ = row
+        return ReportStatusResponse(
+            job_id=job_id,
+            status=status,
+            report=json.loads(report) if report is not None else None,
+            error=error
+        )
+
+    def update(self, job_id: str, **fields: Any):
+        """Sets fields (status, report, error) on a job. Unknown jobs are ignored."""
+        if "report" in fields and fields["report"] is not None:
+            fields["report"] = json.dumps(fields["report"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                f"UPDATE jobs SET {columns}, updated_at = ? WHERE job_id = ?",
+                (*fields.values(), time.time(), job_id)
+            )
+            conn.commit()
+        if cursor.rowcount == 0:
+            logger.warning(f"Job {job_id}: Update for unknown or expired job ignored.")
+
+    def delete(self, job_id: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            conn.commit()
+
+    def add_event(self, job_id: str, event: str, data: Dict[str, Any]):
+        """Appends a progress event to the job's event log."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO job_events (job_id, seq, event, data, created_at) "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM job_events WHERE job_id = ?",
+                (job_id, event, json.dumps(data), time.time(), job_id)
+            )
+            conn.commit()
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """The job's events with seq > `after`, oldest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT seq, event, data, created_at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after)
+            ).fetchall()
+        return [{"seq": seq, "event": event, "data": json.loads(data), "at": at} for seq, event, data, at in rows]
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        # Drop expired jobs, then the oldest ones beyond max_entries
+        expired = conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.ttl_seconds,)).rowcount
+        overflow = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM jobs WHERE job_id IN "
+                "(SELECT job_id FROM jobs ORDER BY updated_at ASC LIMIT ?)",
+                (overflow,)
+            )
+        if expired or overflow > 0:
+            conn.execute("DELETE FROM job_events WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+        self._stats["pruned"] += expired + max(0, overflow)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            return {"backend": self.backend, "entries": entries, **self._stats}
+
+
+def create_job_store(backend: str = JOB_STORE_BACKEND):
+    """Returns a job store for the configured backend ("sqlite" or "memory")."""
+    if backend == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore()
+
+
+# --- Process-wide Store ---
+
+job_store = create_job_store()
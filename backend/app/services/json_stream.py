@@ -0,0 +1,85 @@
+# backend/app/services/json_stream.py
+
+import json
+from typing import Any, List, Tuple
+
+
+class TopLevelMemberParser:
+    """
+    Incrementally parses a streamed JSON object and returns each top-level
+    member as soon as its value is complete.
+
+        parser = TopLevelMemberParser()
+        for chunk in chunks:
+            for key, value in parser.feed(chunk):
+                ...
+
+    Only the structure (strings, nesting) is tracked while scanning; each
+    finished member is then decoded with json.loads, so values are exactly
+    what json.loads would give for the whole document.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = -1
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Adds text and returns the (key, value) members completed by it."""
+        completed: List[Tuple[str, Any]] = []
+        if self._done or not chunk:
+            return completed
+
+        self._text += chunk
+        text = self._text
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(text[self._member_start:i], completed)
+                    self._done = True
+                    break
+            elif ch == "," and self._depth == 1:
+                self._emit(text[self._member_start:i], completed)
+                self._member_start = i + 1
+            i += 1
+
+        # Keep only the unfinished member in memory
+        if self._member_start > 0:
+            drop = self._member_start
+            self._text = text[drop:]
+            self._member_start = 0
+            self._pos = i - drop
+        else:
+            self._pos = i
+        return completed
+
+    @property
+    def done(self) -> bool:
+        """True once the root object has been closed."""
+        return self._done
+
+    def _emit(self, member: str, completed: List[Tuple[str, Any]]):
+        if not member.strip():
+            return
+        decoded = json.loads("{" + member + "}")
+        completed.extend(decoded.items())
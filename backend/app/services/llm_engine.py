@@ -2,11 +2,17 @@
 
 import os
 import json
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 
 from app.models.page_data import PageData, ExtractedFeatures
+from app.services.cache import DiskCache
+from app.services.singleflight import SingleFlight
+from app.services.json_stream import TopLevelMemberParser
+from app.services.prompt_builder import PROMPT_TOKEN_BUDGET, build_data_prompt, compact_json, count_tokens
 from dotenv import load_dotenv
 
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +31,26 @@ except Exception as e:
     logger.error(f"Failed to initialize OpenAI client: {e}")
     client = None
 
+# Stream completions and hand over each top-level node as soon as it's complete
+# (only when the caller passes on_node)
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+
+# "single":   one completion writes the whole report (default)
+# "per_node": one smaller completion per node, run concurrently and merged,
+#             so latency is set by the slowest node and a bad node is retried alone
+LLM_GENERATION_MODE = os.getenv("LLM_GENERATION_MODE", "single")
+LLM_NODE_RETRIES = int(os.getenv("LLM_NODE_RETRIES", "2"))
+
+# --- Report Cache ---
+# Reports keyed by a hash of the prompt inputs, model and prompt version.
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))
+
+report_cache = DiskCache("llm_reports", ttl_seconds=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+# Concurrent jobs with identical prompt inputs share one completion
+report_flights = SingleFlight("llm_report")
+
 def _create_compact_summary(page_data: PageData, features: ExtractedFeatures) -> Dict[str, Any]:
     return {
         "url": str(page_data.url),
@@ -33,75 +59,185 @@ def _create_compact_summary(page_data: PageData, features: ExtractedFeatures) ->
         "h1": page_data.h1,
         "word_count": features.word_count,
         "schema_types": features.schema_types_present,
-        "top_keywords_with_density": list(features.keyword_densities.items())[:20]
+        "top_keywords_with_density": list(features.keyword_densities.items())[:20],
+        "distinctive_terms": [t["term"] for t in features.distinctive_terms[:10]]
     }
 
+# --- Per-Node Generation ---
+# Each node's rules, an example of its output, and the subset of the data it needs.
+
+def _keywords(summary: Dict[str, Any], limit: int) -> List[str]:
+    return [keyword for keyword, _ in summary["top_keywords_with_density"][:limit]]
+
+def _target_brief(target: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: target[k] for k in ("url", "title", "meta_description", "h1", "word_count")}
+
+NODE_SPECS: Dict[str, Dict[str, Any]] = {
+    "node_1_keywords": {
+        "rules": 'Generate 4 "must_have_keywords" and 4 "trending_keywords" for the target, and estimate a "performance_score" (0-100) for its current keyword coverage.',
+        "example": {"performance_score": 85, "must_have_keywords": ["keyword 1", "keyword 2", "keyword 3", "keyword 4"], "trending_keywords": ["trending 1", "trending 2", "trending 3", "trending 4"]},
+        "inputs": lambda target, competitors: {
+            "target": target,
+            "competitor_keywords": [_keywords(c["summary"], 10) for c in competitors],
+        },
+    },
+    "node_2_competitors": {
+        "rules": "Analyze each competitor. 'name' is their page title. 'top_keywords' are 2-3 of their most important keywords. 'differentiator' is a 1-sentence analysis.",
+        "example": {"top_competitors": [{"rank": 1, "url": "https://example.com/course", "name": "University of Example", "top_keywords": ["keyword a", "keyword b"], "differentiator": "Focuses heavily on 'career placements'."}]},
+        "inputs": lambda target, competitors: {
+            "competitors": [{
+                "rank": c["rank"], "url": c["url"], "title": c["title"], "h1": c["summary"]["h1"],
+                "word_count": c["summary"]["word_count"], "top_keywords": _keywords(c["summary"], 10),
+                "distinctive_terms": c["summary"].get("distinctive_terms", []),
+            } for c in competitors],
+        },
+    },
+    "node_3_content_rewrite": {
+        "rules": 'Rewrite the target\'s content. Generate a new title, a 2-sentence intro paragraph ("empower_paragraph"), and 3-4 "Why Choose This Course" bullet points. Estimate an "seo_score" (0-100) for the rewrite.',
+        "example": {"title": "BA (Hons) Example Title", "empower_paragraph": "A new, rewritten introductory paragraph.", "why_choose_points": ["Career-ready skills: A bullet point about skills.", "Accredited for success: A bullet point about accreditation."], "seo_score": 92},
+        "inputs": lambda target, competitors: {
+            "target": target,
+            "competitor_keywords": sorted({k for c in competitors for k in _keywords(c["summary"], 5)}),
+        },
+    },
+    "node_5_metadata": {
+        "rules": "Generate an optimized meta title, a meta description of at most 155 characters, and 4 meta keywords.",
+        "example": {"meta_title": "Optimized Meta Title", "meta_description": "Optimized meta description, 155 characters.", "meta_keywords": ["keyword 1", "keyword 2", "keyword 3", "keyword 4"]},
+        "inputs": lambda target, competitors: {
+            "target": {**_target_brief(target), "top_keywords": _keywords(target, 10)},
+            "competitor_titles": [c["title"] for c in competitors],
+        },
+    },
+    "final_scores": {
+        "rules": "Estimate all 4 scores (0-100) for the target page.",
+        "example": {"final_seo_score": 92, "final_readability": 89, "engagement_lift": 67, "avg_rank_improvement": 43},
+        "inputs": lambda target, competitors: {
+            "target": target,
+            "competitors": [{
+                "rank": c["rank"], "word_count": c["summary"]["word_count"],
+                "schema_types": c["summary"]["schema_types"], "top_keywords": _keywords(c["summary"], 5),
+            } for c in competitors],
+        },
+    },
+}
+
+DATA_NOTES = "'distinctive_terms' are a page's highest TF-IDF terms, i.e. what sets it apart from other course pages."
+
 def _build_system_prompt() -> str:
     """
-    Defines the new 4-node + final_scores structure.
-    Node 6 (QA) is removed. Node 7 is now a top-level 'final_scores' block.
+    Defines the 4-node + final_scores structure, from the same node specs
+    as per-node generation. Node 6 (QA) is removed; 'final_scores' is a
+    top-level block. Contains nothing job-specific, so it is byte-identical
+    across jobs and the provider can cache it as a prompt prefix.
     """
-    
-    json_structure = """
-    {
-      "node_1_keywords": {
-        "performance_score": 85,
-        "must_have_keywords": ["keyword 1", "keyword 2", "keyword 3", "keyword 4"],
-        "trending_keywords": ["trending 1", "trending 2", "trending 3", "trending 4"]
-      },
-      "node_2_competitors": {
-        "top_competitors": [
-          {
-            "rank": 1, 
-            "url": "https://example.com/course",
-            "name": "University of Example", 
-            "top_keywords": ["keyword a", "keyword b"],
-            "differentiator": "Focuses heavily on 'career placements'."
-          }
-        ]
-      },
-      "node_3_content_rewrite": {
-        "title": "BA (Hons) Example Title",
-        "empower_paragraph": "A new, rewritten introductory paragraph.",
-        "why_choose_points": [
-          "Career-ready skills: A bullet point about skills.",
-          "Accredited for success: A bullet point about accreditation."
-        ],
-        "seo_score": 92
-      },
-      "node_5_metadata": {
-        "meta_title": "Optimized Meta Title",
-        "meta_description": "Optimized meta description, 155 characters.",
-        "meta_keywords": ["keyword 1", "keyword 2", "keyword 3", "keyword 4"]
-      },
-      "final_scores": {
-        "final_seo_score": 92,
-        "final_readability": 89,
-        "engagement_lift": 67,
-        "avg_rank_improvement": 43
-      }
-    }
+    rules = [f"For '{node}': {spec['rules']}" for node, spec in NODE_SPECS.items()]
+    rules = ["Base all analysis ONLY on the data provided.", DATA_NOTES] + rules + [
+        "Your response MUST be a single, valid JSON object following this exact structure: "
+        + compact_json({node: spec["example"] for node, spec in NODE_SPECS.items()})
+    ]
+    return (
+        "You are an expert SEO analyst. Your task is to compare a 'Target' course page against its 'Competitors'.\n"
+        "Analyze the provided data and generate a comprehensive SEO report.\n\n"
+        "RULES:\n" + "\n".join(f"{i}. {rule}" for i, rule in enumerate(rules, start=1))
+    )
+
+def _build_node_prompt(node: str) -> str:
+    spec = NODE_SPECS[node]
+    return (
+        "You are an expert SEO analyst comparing a 'Target' course page against its 'Competitors'.\n"
+        f"Base all analysis ONLY on the data provided. {DATA_NOTES}\n"
+        f"Task: {spec['rules']}\n"
+        f"Your response MUST be a single, valid JSON object with exactly this structure: "
+        f"{compact_json({node: spec['example']})}"
+    )
+
+# Built once: these must stay byte-identical across jobs for prefix caching
+SYSTEM_PROMPT = _build_system_prompt()
+NODE_PROMPTS = {node: _build_node_prompt(node) for node in NODE_SPECS}
+USER_PROMPT_SUFFIX = "Fill in all nodes (1, 2, 3, 5) and the final_scores block in the required JSON format."
+
+# Part of the report cache key: any change to the prompts or the node
+# examples (the output schema) gives a new version, so stale reports aren't reused
+PROMPT_VERSION = hashlib.sha256(compact_json({
+    "system": SYSTEM_PROMPT,
+    "nodes": NODE_PROMPTS,
+    "examples": {node: spec["example"] for node, spec in NODE_SPECS.items()},
+    "user_suffix": USER_PROMPT_SUFFIX,
+}).encode("utf-8")).hexdigest()[:16]
+
+def _valid_node(node: str, value: Any) -> bool:
+    """The node has the same top-level fields as its example."""
+    return isinstance(value, dict) and set(NODE_SPECS[node]["example"]) <= set(value)
+
+def _generate_node(node: str, target_summary: Dict[str, Any], competitor_data: List[Dict[str, Any]], log_prefix: str = "") -> Any:
+    """Generates one node with its own small prompt, retrying just this node on failure."""
+    inputs = NODE_SPECS[node]["inputs"](target_summary, competitor_data)
+    messages = [
+        {"role": "system", "content": NODE_PROMPTS[node]},
+        {"role": "user", "content": compact_json(inputs)}
+    ]
+    logger.info(f"{log_prefix}Prompt tokens for '{node}': system={count_tokens(messages[0]['content'], MODEL)} data={count_tokens(messages[1]['content'], MODEL)}")
+    last_error: Optional[Exception] = None
+    for attempt in range(1 + LLM_NODE_RETRIES):
+        try:
+            response = client.chat.completions.create(
+                model=MODEL,
+                response_format={"type": "json_object"},
+                messages=messages,
+                temperature=0.5,
+            )
+            value = json.loads(response.choices[0].message.content).get(node)
+            if not _valid_node(node, value):
+                raise ValueError(f"Malformed '{node}' in response")
+            return value
+        except Exception as e:
+            last_error = e
+            logger.warning(f"Node '{node}' attempt {attempt + 1} failed: {e}")
+    raise RuntimeError(f"Node '{node}' failed after {1 + LLM_NODE_RETRIES} attempts: {last_error}")
+
+def _generate_per_node(target_summary: Dict[str, Any], competitor_data: List[Dict[str, Any]],
+                       on_node: Optional[Callable[[str, Any], None]] = None, log_prefix: str = "") -> Dict[str, Any]:
+    """Runs one completion per node concurrently and merges them into the report schema."""
+    nodes: Dict[str, Any] = {}
+    with ThreadPoolExecutor(max_workers=len(NODE_SPECS), thread_name_prefix="llm-node") as executor:
+        futures = {executor.submit(_generate_node, node, target_summary, competitor_data, log_prefix): node for node in NODE_SPECS}
+        for future in as_completed(futures):
+            node = futures[future]
+            nodes[node] = future.result()
+            if on_node is not None:
+                on_node(node, nodes[node])
+    # Same key order as the single-call report
+    return {node: nodes[node] for node in NODE_SPECS}
+
+def _report_cache_key(target_summary: Dict[str, Any], competitor_data: List[Dict[str, Any]]) -> str:
+    """A stable hash of everything that determines the report."""
+    payload = json.dumps({
+        "model": MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "generation_mode": LLM_GENERATION_MODE,
+        "prompt_budget": PROMPT_TOKEN_BUDGET,
+        "target": target_summary,
+        "competitors": competitor_data
+    }, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_llm_recommendations(target_page: PageData, target_features: ExtractedFeatures, competitor_pages: List[PageData], competitor_features: List[ExtractedFeatures], use_cache: bool = True,
+                            on_node: Optional[Callable[[str, Any], None]] = None, job_id: Optional[str] = None) -> Dict[str, Any]:
     """
-    
-    return f"""
-    You are an expert SEO analyst. Your task is to compare a 'Target' course page against its 'Competitors'.
-    Analyze the provided data and generate a comprehensive SEO report.
-    
-    RULES:
-    1.  Base all analysis ONLY on the data provided.
-    2.  For 'node_1_keywords', generate "must-have" and "trending" keywords. Estimate a "performance_score" (0-100).
-    3.  For 'node_2_competitors', analyze each competitor. 'name' is their page title. 'top_keywords' are 2-3 of their most important keywords. 'differentiator' is a 1-sentence analysis.
-    4.  For 'node_3_content_rewrite', rewrite the target's content. Generate a new title, a 2-sentence intro paragraph, and 3-4 "Why Choose This Course" bullet points. Estimate an "seo_score" (0-100).
-    5.  For 'node_5_metadata', generate an optimized meta title, description, and 4 meta keywords.
-    6.  For 'final_scores', **estimate** all 4 scores (0-100) for the target page.
-    7.  Your response MUST be a single, valid JSON object following this exact structure: {json_structure}
+    Generates the 4-node SEO report.
+    Reports for identical inputs are served from the report cache unless use_cache=False
+    (a fresh report is still written back to the cache). Identical requests
+    already in flight share one completion.
+    With streaming on, `on_node(name, value)` is called as each top-level node
+    of a freshly generated report completes. Cached or shared reports arrive
+    whole, so callers should still handle any nodes not seen via on_node.
+    `job_id` only labels the log lines (including prompt token counts).
     """
-
-def get_llm_recommendations(target_page: PageData, target_features: ExtractedFeatures, competitor_pages: List[PageData], competitor_features: List[ExtractedFeatures]) -> Dict[str, Any]:
     if not client:
         return {"error": "OpenAI client not initialized."}
 
-    logger.info(f"Generating NEW 4-node report for target: {target_page.url}")
+    log_prefix = f"Job {job_id}: " if job_id else ""
+    logger.info(f"{log_prefix}Generating NEW 4-node report for target: {target_page.url}")
 
     target_summary = _create_compact_summary(target_page, target_features)
     
@@ -115,36 +251,81 @@ def get_llm_recommendations(target_page: PageData, target_features: ExtractedFea
                 "summary": _create_compact_summary(page, competitor_features[i])
             })
     
-    user_prompt = f"""
-    Here is the data for analysis:
+    cache_key = _report_cache_key(target_summary, competitor_data_for_prompt)
+    flight_key = cache_key if use_cache else f"{cache_key}|fresh"
+    return report_flights.do(flight_key, _generate_report, target_summary, competitor_data_for_prompt, cache_key, use_cache, on_node, log_prefix)
 
-    **Target Page:**
-    {json.dumps(target_summary, indent=2)}
+def _complete_streaming(messages: List[Dict[str, str]], on_node: Callable[[str, Any], None]) -> Dict[str, Any]:
+    """Streams a JSON completion, calling on_node for each top-level member as it completes."""
+    stream = client.chat.completions.create(
+        model=MODEL,
+        response_format={"type": "json_object"},
+        messages=messages,
+        temperature=0.5,
+        stream=True,
+    )
+    parser = TopLevelMemberParser()
+    parts: List[str] = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        for name, value in parser.feed(delta):
+            logger.info(f"Streamed node '{name}'")
+            on_node(name, value)
+    return json.loads("".join(parts))
 
-    **Competitor Data:**
-    {json.dumps(competitor_data_for_prompt, indent=2)}
+def _generate_report(target_summary: Dict[str, Any], competitor_data_for_prompt: List[Dict[str, Any]], cache_key: str, use_cache: bool,
+                     on_node: Optional[Callable[[str, Any], None]] = None, log_prefix: str = "") -> Dict[str, Any]:
+    target_url = target_summary["url"]
+    if use_cache:
+        cached = report_cache.get(cache_key)
+        if cached:
+            logger.info(f"Report cache hit for target: {target_url}")
+            return cached.value
 
-    Please provide the full SEO analysis in the required JSON format.
-    Fill in all nodes (1, 2, 3, 5) and the final_scores block as requested.
-    """
-    
-    system_prompt = _build_system_prompt()
+    if LLM_GENERATION_MODE == "per_node":
+        try:
+            report_json = _generate_per_node(target_summary, competitor_data_for_prompt, on_node, log_prefix)
+        except Exception as e:
+            logger.error(f"Error calling OpenAI API: {e}")
+            return {"error": f"Failed to get LLM response: {e}"}
+        logger.info(f"Successfully generated NEW 4-node report (per node) for {target_url}")
+        report_cache.set(cache_key, report_json)
+        return report_json
+
+    # Static instructions first (identical for every job), then this job's data
+    data_prompt, prompt_stats = build_data_prompt(target_summary, competitor_data_for_prompt, model=MODEL)
+    user_prompt = data_prompt + "\n" + USER_PROMPT_SUFFIX
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+    logger.info(
+        f"{log_prefix}Prompt tokens: system={count_tokens(SYSTEM_PROMPT, MODEL)} "
+        f"data={prompt_stats.tokens}/{prompt_stats.budget} "
+        f"trimmed={prompt_stats.trimmed or 'none'} competitors_dropped={prompt_stats.competitors_dropped}"
+    )
     
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.5, 
-        )
-        
-        response_content = response.choices[0].message.content
-        report_json = json.loads(response_content)
+        if LLM_STREAMING and on_node is not None:
+            report_json = _complete_streaming(messages, on_node)
+        else:
+            response = client.chat.completions.create(
+                model=MODEL,
+                response_format={"type": "json_object"},
+                messages=messages,
+                temperature=0.5, 
+            )
+            
+            response_content = response.choices[0].message.content
+            report_json = json.loads(response_content)
         
-        logger.info(f"Successfully generated NEW 4-node report for {target_page.url}")
+        logger.info(f"Successfully generated NEW 4-node report for {target_url}")
+        report_cache.set(cache_key, report_json)
         return report_json
 
     except Exception as e:
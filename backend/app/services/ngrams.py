@@ -0,0 +1,77 @@
+# backend/app/services/ngrams.py
+#
+# N-gram counting on integer token ids. Tokens are interned once, each n-gram
+# is packed into a single int64 (built from the (n-1)-gram's id, so it never
+# overflows), and counting is done by NumPy. Strings are only built for the
+# n-grams that make the top N.
+
+import numpy as np
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class NgramCounts(NamedTuple):
+    n: int
+    counts: np.ndarray  # occurrences of each distinct n-gram
+    first: np.ndarray   # token position where each n-gram first appears
+    inverse: np.ndarray # distinct n-gram id at every position
+
+
+def encode_tokens(tokens: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """Interns tokens. Returns (ids, vocab) with vocab[ids[i]] == tokens[i]."""
+    index: Dict[str, int] = {}
+    ids = [index.setdefault(token, len(index)) for token in tokens]
+    return np.array(ids, dtype=np.int64), list(index)
+
+
+def count_ngrams(ids: np.ndarray, vocab_size: int, max_n: int = 3) -> List[NgramCounts]:
+    """Counts the distinct 1..max_n-grams of an id array."""
+    results: List[NgramCounts] = []
+    keys = ids
+    for n in range(1, max_n + 1):
+        if len(ids) < n:
+            break
+        if n > 1:
+            # An n-gram is its leading (n-1)-gram plus one more token
+            keys = results[-1].inverse[:-1] * vocab_size + ids[n - 1:]
+        _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+        results.append(NgramCounts(n=n, counts=counts, first=first, inverse=inverse.reshape(-1)))
+    return results
+
+
+def top_ngrams(ngram_counts: List[NgramCounts], top_n: int) -> List[Tuple[int, int, int]]:
+    """
+    The top_n most frequent n-grams as (count, n, first) tuples, most
+    frequent first. Ties go to shorter n-grams, then to the one that
+    appears first in the text.
+    """
+    if top_n <= 0 or not ngram_counts:
+        return []
+
+    counts = np.concatenate([c.counts for c in ngram_counts])
+    # One sortable rank for the tie-break: n first, then first position
+    span = max(len(c.inverse) for c in ngram_counts) + 1
+    ranks = np.concatenate([c.n * span + c.first for c in ngram_counts])
+
+    if len(counts) > top_n:
+        # Partial sort: the top_n-th largest count is the cut-off
+        cutoff = np.partition(counts, len(counts) - top_n)[len(counts) - top_n]
+        above = np.flatnonzero(counts > cutoff)
+        ties = np.flatnonzero(counts == cutoff)
+        needed = top_n - len(above)
+        if needed < len(ties):
+            ties = ties[np.argpartition(ranks[ties], needed - 1)[:needed]]
+        selected = np.concatenate([above, ties])
+    else:
+        selected = np.arange(len(counts))
+
+    order = selected[np.lexsort((ranks[selected], -counts[selected]))]
+    return [(int(counts[i]), int(ranks[i] // span), int(ranks[i] % span)) for i in order]
+
+
+def term_counts(tokens: List[str], ngram_counts: List[NgramCounts]) -> Dict[str, int]:
+    """Every distinct n-gram in `ngram_counts` as a string, with its count."""
+    terms: Dict[str, int] = {}
+    for c in ngram_counts:
+        for count, first in zip(c.counts.tolist(), c.first.tolist()):
+            terms[" ".join(tokens[first:first + c.n])] = count
+    return terms
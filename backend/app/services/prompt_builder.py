@@ -0,0 +1,138 @@
+# backend/app/services/prompt_builder.py
+
+import os
+import re
+import copy
+import json
+import math
+import threading
+import logging
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Prompt Budget Settings ---
+# Token budget for the per-job data in a prompt (the static instructions are extra)
+PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "3000"))
+# Characters kept from long titles/headings/descriptions once trimming starts
+TRIMMED_TEXT_CHARS = 120
+
+# Exact counts need the optional 'tiktoken' package (and its encoding files);
+# without it we fall back to a close estimate.
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_ESTIMATE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _get_encoding(model: str):
+    global _encoding, TIKTOKEN_AVAILABLE
+    with _encoding_lock:
+        if _encoding is None and TIKTOKEN_AVAILABLE:
+            try:
+                try:
+                    _encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.warning(f"Could not load tiktoken encoding ({e}). Estimating token counts.")
+                TIKTOKEN_AVAILABLE = False
+        return _encoding
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Counts tokens locally: exactly with tiktoken, otherwise a BPE-like estimate."""
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly one token per 4 characters of a word, one per punctuation mark
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _ESTIMATE_RE.findall(text))
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation or spaces; unicode kept as-is (escapes cost tokens)."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+class PromptStats(NamedTuple):
+    tokens: int
+    budget: int
+    trimmed: List[str]  # trimming steps applied, in order
+    competitors_dropped: int
+
+
+def _round_densities(summary: Dict[str, Any]):
+    summary["top_keywords_with_density"] = [
+        [keyword, round(density, 2)] for keyword, density in summary["top_keywords_with_density"]
+    ]
+
+def _cap_keywords(summary: Dict[str, Any], limit: int):
+    summary["top_keywords_with_density"] = summary["top_keywords_with_density"][:limit]
+
+def _shorten(summary: Dict[str, Any], field: str):
+    value = summary.get(field)
+    if isinstance(value, str) and len(value) > TRIMMED_TEXT_CHARS:
+        summary[field] = value[:TRIMMED_TEXT_CHARS].rstrip() + "..."
+
+
+def _trim_steps(target: Dict[str, Any], competitors: List[Dict[str, Any]]):
+    """
+    Trimming steps, least valuable data first. Competitor detail goes
+    before target detail, and the target's own keywords go last.
+    """
+    summaries = [c["summary"] for c in competitors]
+    yield "competitor_distinctive_terms", lambda: [s.pop("distinctive_terms", None) for s in summaries]
+    yield "competitor_keywords_10", lambda: [_cap_keywords(s, 10) for s in summaries]
+    yield "competitor_meta_descriptions", lambda: [s.pop("meta_description", None) for s in summaries]
+    yield "long_text", lambda: [
+        _shorten(item, field)
+        for item in [target] + summaries + competitors
+        for field in ("title", "h1", "meta_description")
+    ]
+    yield "competitor_keywords_5", lambda: [_cap_keywords(s, 5) for s in summaries]
+    yield "target_keywords_10", lambda: _cap_keywords(target, 10)
+
+
+def build_data_prompt(target_summary: Dict[str, Any], competitor_data: List[Dict[str, Any]],
+                      budget: int = PROMPT_TOKEN_BUDGET, model: str = "gpt-4o-mini") -> Tuple[str, PromptStats]:
+    """
+    Serializes the per-job data compactly and trims lower-value fields
+    until it fits `budget` tokens. If it still doesn't fit, the
+    lowest-ranked competitors are dropped (at least one is always kept).
+    The inputs are not modified.
+    """
+    target = copy.deepcopy(target_summary)
+    competitors = copy.deepcopy(competitor_data)
+    for summary in [target] + [c["summary"] for c in competitors]:
+        _round_densities(summary)
+
+    def render() -> str:
+        return f"Target page:\n{compact_json(target)}\nCompetitors:\n{compact_json(competitors)}"
+
+    prompt = render()
+    tokens = count_tokens(prompt, model)
+    trimmed: List[str] = []
+
+    for name, step in _trim_steps(target, competitors):
+        if tokens <= budget:
+            break
+        step()
+        trimmed.append(name)
+        prompt = render()
+        tokens = count_tokens(prompt, model)
+
+    dropped = 0
+    while tokens > budget and len(competitors) > 1:
+        competitors.pop()
+        dropped += 1
+        prompt = render()
+        tokens = count_tokens(prompt, model)
+
+    if tokens > budget:
+        logger.warning(f"Prompt data is {tokens} tokens after trimming (budget {budget}).")
+    return prompt, PromptStats(tokens=tokens, budget=budget, trimmed=trimmed, competitors_dropped=dropped)
@@ -0,0 +1,227 @@
+# backend/app/services/renderer.py
+
+import os
+import time
+import logging
+from urllib.parse import urlparse
+from typing import Dict, NamedTuple, Optional
+from playwright.sync_api import BrowserContext, Route, Error as PlaywrightError
+from playwright.async_api import BrowserContext as AsyncBrowserContext, Route as AsyncRoute
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Render Settings ---
+# "fast": block heavy resources and wait for content signals (default)
+# "networkidle": load everything and wait for network silence (the old behaviour)
+RENDER_MODE = os.getenv("RENDER_MODE", "fast")
+
+# Hard wall-clock budget for one page, from navigation to serialized HTML
+RENDER_BUDGET_MS = int(os.getenv("RENDER_BUDGET_MS", "15000"))
+READY_POLL_MS = 200
+
+# Resource types that never affect the text we extract
+BLOCKED_RESOURCE_TYPES = frozenset(["image", "media", "font"])
+
+# Analytics / ad / chat hosts common on university marketing pages
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "linkedin.com",
+    "licdn.com",
+    "tiktok.com",
+    "twitter.com",
+    "ads-twitter.com",
+    "bing.com",
+    "hubspot.com",
+    "hs-analytics.net",
+    "cookiebot.com",
+    "onetrust.com",
+    "intercom.io",
+    "livechatinc.com",
+)
+
+# Reports how much text the main content area has, and whether there's an H1
+READINESS_JS = """() => {
+    const root = document.querySelector('main') || document.body;
+    return {
+        textLength: root ? root.textContent.length : 0,
+        hasH1: !!document.querySelector('h1')
+    };
+}"""
+
+
+class RenderResult(NamedTuple):
+    html: str
+    status_code: int
+    timings: Dict[str, float]  # milliseconds per stage
+
+
+def should_block(resource_type: str, url: str) -> bool:
+    """True for requests the fast render mode aborts. Documents are always allowed."""
+    if resource_type == "document":
+        return False
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(url).hostname or ""
+    return any(host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_HOSTS)
+
+def _handle_route(route: Route):
+    request = route.request
+    if should_block(request.resource_type, request.url):
+        route.abort()
+    else:
+        route.continue_()
+
+async def _handle_route_async(route: AsyncRoute):
+    request = route.request
+    if should_block(request.resource_type, request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+def is_ready(signals: Dict, stable_polls: int) -> bool:
+    """
+    Content-based readiness: the main text has stopped growing and either
+    an H1 is present or the text has been stable for a few polls.
+    """
+    if signals["textLength"] == 0:
+        return False
+    if signals["hasH1"] and stable_polls >= 1:
+        return True
+    return stable_polls >= 3
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.monotonic() - since) * 1000, 1)
+
+def _context_destroyed(error: PlaywrightError) -> bool:
+    # A client-side redirect or reload replaced the document mid-evaluate
+    return "Execution context was destroyed" in str(error)
+
+
+class _Readiness:
+    """
+    The readiness wait for one page, shared by the sync and async renderers:
+    tracks how long the main text has been stable, and the render deadline.
+    """
+
+    def __init__(self, url: str, deadline: float):
+        self.url = url
+        self.deadline = deadline
+        self.started = time.monotonic()
+        self.ready = False
+        self._previous_length = -1
+        self._stable_polls = 0
+
+    def waiting(self) -> bool:
+        return not self.ready and time.monotonic() < self.deadline
+
+    def observe(self, signals: Optional[Dict]) -> bool:
+        """Records one poll's signals (None: the document was replaced). True once ready."""
+        if signals is None:
+            # Start over on the new document
+            self._previous_length, self._stable_polls = -1, 0
+            return False
+        self._stable_polls = self._stable_polls + 1 if signals["textLength"] == self._previous_length else 0
+        self._previous_length = signals["textLength"]
+        self.ready = is_ready(signals, self._stable_polls)
+        return self.ready
+
+    def finish(self) -> float:
+        """Milliseconds spent waiting, warning if the deadline came first."""
+        if not self.ready:
+            logger.warning(f"Render budget reached before content settled: {self.url}")
+        return _elapsed_ms(self.started)
+
+
+def _poll_signals(page) -> Optional[Dict]:
+    try:
+        return page.evaluate(READINESS_JS)
+    except PlaywrightError as e:
+        if not _context_destroyed(e):
+            raise
+        return None
+
+async def _poll_signals_async(page) -> Optional[Dict]:
+    try:
+        return await page.evaluate(READINESS_JS)
+    except PlaywrightError as e:
+        if not _context_destroyed(e):
+            raise
+        return None
+
+def render_page(context: BrowserContext, url: str) -> RenderResult:
+    """
+    Loads `url` in a browser context and returns its rendered HTML.
+    Stays within RENDER_BUDGET_MS; if content never settles, whatever has
+    rendered by the deadline is returned.
+    """
+    started = time.monotonic()
+    deadline = started + RENDER_BUDGET_MS / 1000
+    timings: Dict[str, float] = {}
+    page = context.new_page()
+
+    if RENDER_MODE == "networkidle":
+        response = page.goto(url, wait_until='networkidle', timeout=RENDER_BUDGET_MS)
+        timings["navigation_ms"] = _elapsed_ms(started)
+    else:
+        page.route("**/*", _handle_route)
+        response = page.goto(url, wait_until='domcontentloaded', timeout=RENDER_BUDGET_MS)
+        timings["navigation_ms"] = _elapsed_ms(started)
+
+        # Wait for content signals rather than network silence
+        readiness = _Readiness(url, deadline)
+        while readiness.waiting():
+            if not readiness.observe(_poll_signals(page)):
+                page.wait_for_timeout(READY_POLL_MS)
+        timings["ready_ms"] = readiness.finish()
+
+    content_started = time.monotonic()
+    html = page.content()
+    timings["content_ms"] = _elapsed_ms(content_started)
+    timings["total_ms"] = _elapsed_ms(started)
+
+    status_code = response.status if response else 0
+    logger.info(f"Rendered {url} in {timings['total_ms']}ms ({timings})")
+    return RenderResult(html=html, status_code=status_code, timings=timings)
+
+async def render_page_async(context: AsyncBrowserContext, url: str) -> RenderResult:
+    """
+    The async-API version of render_page (same modes, budget and timings),
+    so many pages can render at once in one browser.
+    """
+    started = time.monotonic()
+    deadline = started + RENDER_BUDGET_MS / 1000
+    timings: Dict[str, float] = {}
+    page = await context.new_page()
+
+    if RENDER_MODE == "networkidle":
+        response = await page.goto(url, wait_until='networkidle', timeout=RENDER_BUDGET_MS)
+        timings["navigation_ms"] = _elapsed_ms(started)
+    else:
+        await page.route("**/*", _handle_route_async)
+        response = await page.goto(url, wait_until='domcontentloaded', timeout=RENDER_BUDGET_MS)
+        timings["navigation_ms"] = _elapsed_ms(started)
+
+        # Wait for content signals rather than network silence
+        readiness = _Readiness(url, deadline)
+        while readiness.waiting():
+            if not readiness.observe(await _poll_signals_async(page)):
+                await page.wait_for_timeout(READY_POLL_MS)
+        timings["ready_ms"] = readiness.finish()
+
+    content_started = time.monotonic()
+    html = await page.content()
+    timings["content_ms"] = _elapsed_ms(content_started)
+    timings["total_ms"] = _elapsed_ms(started)
+
+    status_code = response.status if response else 0
+    logger.info(f"Rendered {url} in {timings['total_ms']}ms ({timings})")
+    return RenderResult(html=html, status_code=status_code, timings=timings)
@@ -1,12 +1,27 @@
 # backend/app/services/scraper.py
 
-import requests
+import os
+import re
+import codecs
+import threading
+import httpx
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 import logging
 from app.models.page_data import PageData
 from app.services import extractor
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from app.services import features
+from app.services import fast_extractor
+from app.services import browser_pool
+from app.services import cpu_pool
+from app.services import renderer
+from app.services import http_client
+from app.services import domain_strategy
+from app.services.cache import DiskCache
+from app.services.singleflight import SingleFlight
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 
 # Re-use the User-Agent
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
@@ -15,40 +30,91 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def _parse_html(url: str, html: str, status_code: int) -> PageData:
+# "lxml" (single-pass engine) or "bs4" (one BeautifulSoup scan per field)
+EXTRACTION_ENGINE = os.getenv("EXTRACTION_ENGINE", "lxml")
+
+# --- Download Limits ---
+# Bodies above this size are truncated (and flagged on the PageData)
+MAX_PAGE_BYTES = int(os.getenv("SCRAPER_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# --- Concurrency Limits ---
+# Global cap on pages being scraped at once (across all jobs),
+# and a per-host cap so we don't hammer a single university site.
+MAX_CONCURRENT_SCRAPES = int(os.getenv("SCRAPER_MAX_CONCURRENCY", "8"))
+MAX_SCRAPES_PER_HOST = int(os.getenv("SCRAPER_MAX_PER_HOST", "2"))
+
+_global_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_SCRAPES)
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+# --- Page Cache ---
+# Parsed PageData keyed by normalized URL, persisted across restarts.
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", str(6 * 60 * 60)))
+SCRAPE_CACHE_MAX_ENTRIES = int(os.getenv("SCRAPE_CACHE_MAX_ENTRIES", "5000"))
+
+page_cache = DiskCache("pages", ttl_seconds=SCRAPE_CACHE_TTL, max_entries=SCRAPE_CACHE_MAX_ENTRIES)
+
+# Concurrent jobs asking for the same page share one scrape
+scrape_flights = SingleFlight("scrape")
+
+def _extract_with_bs4(html: Union[str, bytes], encoding: Optional[str] = None) -> Dict[str, Any]:
     """
-    Internal function to parse HTML using BeautifulSoup and our extractor.
-    This is re-used by both simple and playwright scrapers.
+    The original extraction path: BeautifulSoup plus one `extractor.*` call per field.
     """
-    try:
+    if isinstance(html, bytes):
+        soup = BeautifulSoup(html, 'lxml', from_encoding=encoding)
+    else:
         soup = BeautifulSoup(html, 'lxml')
 
-        # 1. Extract all headings at once
-        all_headings = extractor.extract_headings(soup)
-        
-        # 2. Get the first H1 from the list, if it exists
-        first_h1 = ""
-        if 'h1' in all_headings and all_headings['h1']:
-            first_h1 = all_headings['h1'][0]
-
-        # 3. Use extractor functions
-        main_content = extractor.extract_main_content(soup)
-        word_count = len(main_content.split())
+    return {
+        "title": extractor.extract_title(soup),
+        "meta_description": extractor.extract_meta_description(soup),
+        "meta_keywords": extractor.extract_meta_keywords(soup),
+        "canonical_url": extractor.extract_canonical_url(soup),
+        "headings": extractor.extract_headings(soup),
+        "main_content": extractor.extract_main_content(soup),
+        "json_ld": extractor.extract_json_ld(soup),
+        "links": extractor.extract_links(soup),
+        "image_alt_texts": extractor.extract_image_alt_texts(soup)
+    }
+
+def _extract_fields(html: Union[str, bytes], encoding: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parses HTML into the PageData fields (plus h1 and word_count).
+    Runs in the CPU pool when it's enabled: raw bytes in, plain fields out.
+    Uses the single-pass lxml engine unless EXTRACTION_ENGINE=bs4.
+    """
+    if EXTRACTION_ENGINE == "bs4":
+        fields = _extract_with_bs4(html, encoding)
+    else:
+        fields = fast_extractor.extract_all(html, encoding)
+
+    # Get the first H1 from the headings, if it exists
+    all_headings = fields["headings"]
+    first_h1 = ""
+    if 'h1' in all_headings and all_headings['h1']:
+        first_h1 = all_headings['h1'][0]
+    fields["h1"] = first_h1
+
+    # Analyzed once here; feature extraction reuses the same document
+    fields["word_count"] = features.analyze(fields["main_content"]).word_count
+    return fields
+
+def _parse_html(url: str, html: Union[str, bytes], status_code: int, encoding: Optional[str] = None, truncated: bool = False) -> PageData:
+    """
+    Internal function to parse HTML into PageData.
+    This is re-used by both simple and playwright scrapers.
+    `html` may be raw bytes, with the encoding declared by the server (if any).
+    """
+    try:
+        fields = cpu_pool.run(_extract_fields, html, encoding)
         
         page_data = PageData(
             url=url,
             status_code=status_code,
-            title=extractor.extract_title(soup),
-            meta_description=extractor.extract_meta_description(soup),
-            meta_keywords=extractor.extract_meta_keywords(soup),
-            canonical_url=extractor.extract_canonical_url(soup),
-            h1=first_h1,
-            headings=all_headings,
-            main_content=main_content,
-            word_count=word_count,
-            json_ld=extractor.extract_json_ld(soup),
-            links=extractor.extract_links(soup),
-            image_alt_texts=extractor.extract_image_alt_texts(soup)
+            truncated=truncated,
+            **fields
         )
         return page_data
     except Exception as e:
@@ -58,28 +124,26 @@ def _parse_html(url: str, html: str, status_code: int) -> PageData:
 def _scrape_with_playwright(url: str) -> PageData:
     """
     Scrapes a single page using the "Fallback" (Playwright) method.
+    Rendering runs in a fresh context of a shared, long-lived browser.
+    With the async backend, fallbacks from concurrent scrape_pages workers
+    render side by side in that browser instead of queueing.
     """
     logger.info(f"Using Playwright fallback for: {url}")
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(user_agent=USER_AGENT)
-            
-            # Wait for the page to be fully loaded
-            response = page.goto(url, wait_until='networkidle', timeout=15000)
-            
-            html = page.content()
-            status_code = response.status if response else 0
-            
-            browser.close()
-
-            if status_code != 200:
-                 logger.error(f"Playwright failed to load {url}. Status: {status_code}")
-                 return PageData(url=url, status_code=status_code, error=f"Playwright received status {status_code}")
-
-            logger.info(f"Playwright successfully fetched: {url}")
-            # Now, parse the HTML
-            return _parse_html(url=url, html=html, status_code=status_code)
+        pool = browser_pool.get_pool()
+        render = renderer.render_page_async if pool.is_async else renderer.render_page
+        result = pool.run(lambda context: render(context, url), user_agent=USER_AGENT)
+        html, status_code = result.html, result.status_code
+
+        if status_code != 200:
+             logger.error(f"Playwright failed to load {url}. Status: {status_code}")
+             return PageData(url=url, status_code=status_code, error=f"Playwright received status {status_code}")
+
+        logger.info(f"Playwright successfully fetched: {url}")
+        # Now, parse the HTML
+        page_data = _parse_html(url=url, html=html, status_code=status_code)
+        page_data.timings = result.timings
+        return page_data
 
     except PlaywrightTimeoutError:
         logger.error(f"Playwright timeout while scraping {url}")
@@ -88,46 +152,255 @@ def _scrape_with_playwright(url: str) -> PageData:
         logger.error(f"Playwright unexpected error for {url}. Error: {e}")
         return PageData(url=url, status_code=500, error=f"Playwright error: {e}")
 
-def scrape_page(url: str) -> PageData:
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL for use as a cache key:
+    lowercases scheme/host, drops default ports and fragments, sorts query params.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+def _is_html_content_type(content_type: str) -> bool:
+    """True for HTML/XHTML responses. A missing Content-Type is given the benefit of the doubt."""
+    if not content_type:
+        return True
+    mime_type = content_type.split(';', 1)[0].strip().lower()
+    return mime_type in HTML_CONTENT_TYPES
+
+def _declared_encoding(content_type: str) -> Optional[str]:
+    """
+    Returns the charset from a Content-Type header, if it names a known codec.
+    The label is returned as declared (e.g. "EUC-KR"): libxml2 understands
+    the standard labels, not Python's codec names ("euc_kr").
+    """
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type or '', re.IGNORECASE)
+    if not match:
+        return None
+    try:
+        codecs.lookup(match.group(1))
+    except LookupError:
+        return None
+    return match.group(1)
+
+def _read_capped(response: httpx.Response, max_bytes: int) -> Tuple[bytes, bool]:
+    """
+    Reads a streamed response body up to `max_bytes`.
+    Returns (body, truncated).
+    """
+    body = bytearray()
+    for chunk in response.iter_bytes(chunk_size=64 * 1024):
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            return bytes(body[:max_bytes]), True
+    return bytes(body), False
+
+def _fallback_to_playwright(url: str, probed: bool = True) -> PageData:
+    """
+    Scrapes with Playwright and records the outcome for the URL's domain.
+    Errors that only concern this URL (e.g. a 404) are not held against the domain.
+    """
+    page_data = _scrape_with_playwright(url)
+    if not page_data.error:
+        domain_strategy.record_outcome(url, domain_strategy.PLAYWRIGHT, probed=probed)
+    elif domain_strategy.is_domain_failure(page_data.status_code):
+        domain_strategy.record_outcome(url, domain_strategy.FAILED, probed=probed)
+    return page_data
+
+def _fetch_page(url: str, validators: Optional[Dict[str, str]] = None,
+                skip_failing_domains: bool = True) -> Tuple[Optional[PageData], Dict[str, str]]:
     """
-    Scrapes a single page. Tries "Simple" (requests) first,
+    Fetches and parses a single page. Tries "Simple" (pooled HTTP client) first,
     then falls back to "Robust" (Playwright) if needed.
+    With skip_failing_domains=False, a page on a domain marked "skip" is
+    still fetched (straight with Playwright).
+
+    If `validators` (ETag / Last-Modified from a cached copy) are given, the
+    request is made conditional. A 304 Not Modified returns (None, validators)
+    so the caller can reuse its cached parse.
     """
-    logger.info(f"Starting scrape for URL: {url}")
-    
+    # Accept-Encoding and keep-alive are handled by the shared client
     headers = {
         'User-Agent': USER_AGENT,
         'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-        'Connection': 'keep-alive'
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8'
     }
+    if validators:
+        if validators.get("etag"):
+            headers['If-None-Match'] = validators["etag"]
+        if validators.get("last_modified"):
+            headers['If-Modified-Since'] = validators["last_modified"]
+
+    # Route known JS-heavy / failing domains without the doomed simple attempt
+    strategy = domain_strategy.predict_strategy(url)
+    if strategy == domain_strategy.STRATEGY_SKIP:
+        if skip_failing_domains:
+            logger.warning(f"Skipping {url}: its domain has been failing consistently.")
+            return PageData(url=url, status_code=503, error="Skipped: domain has been failing consistently"), {}
+        logger.warning(f"Domain has been failing consistently, but {url} is required. Trying Playwright directly.")
+        return _fallback_to_playwright(url, probed=False), {}
+    if strategy == domain_strategy.STRATEGY_PLAYWRIGHT:
+        logger.info(f"Domain is known to need Playwright. Skipping simple attempt for {url}.")
+        return _fallback_to_playwright(url, probed=False), {}
 
     try:
-        # --- SIMPLE ATTEMPT (requests) ---
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+        # --- SIMPLE ATTEMPT (shared keep-alive client, streamed) ---
+        with http_client.stream("GET", url, headers=headers, timeout=10) as response:
+            if response.status_code == 304 and validators:
+                logger.info(f"Not modified since last scrape: {url}")
+                domain_strategy.record_outcome(url, domain_strategy.SIMPLE, probed=True)
+                return None, validators
+
+            response.raise_for_status()  # Raise HTTPStatusError for bad responses (4xx or 5xx)
+
+            # Check the type before downloading anything (PDFs, images, etc.)
+            content_type = response.headers.get('Content-Type', '')
+            if not _is_html_content_type(content_type):
+                logger.warning(f"Skipping non-HTML response for {url} ({content_type}).")
+                return PageData(url=url, status_code=response.status_code, error=f"Unsupported content type: {content_type}"), {}
 
-        page_data = _parse_html(url=url, html=response.text, status_code=response.status_code)
+            body, truncated = _read_capped(response, MAX_PAGE_BYTES)
+            if truncated:
+                logger.warning(f"Page {url} exceeded {MAX_PAGE_BYTES} bytes. Truncated.")
+
+            new_validators = {
+                "etag": response.headers.get('ETag', ''),
+                "last_modified": response.headers.get('Last-Modified', '')
+            }
+            status_code = response.status_code
+
+        # Raw bytes go straight to the parser, with the server's declared charset
+        page_data = _parse_html(
+            url=url,
+            html=body,
+            status_code=status_code,
+            encoding=_declared_encoding(content_type),
+            truncated=truncated
+        )
 
         # CHECK for signs of a JS-heavy page (e.g., bot block or empty body)
         if page_data.word_count < 100 and (page_data.h1 is None or page_data.h1 == ""):
              logger.warning(f"Low word count ({page_data.word_count})... possible JS page. Retrying with Playwright.")
-             return _scrape_with_playwright(url)
+             return _fallback_to_playwright(url), new_validators
         
         logger.info(f"Successfully scraped with 'simple' method: {url}")
-        return page_data
+        domain_strategy.record_outcome(url, domain_strategy.SIMPLE, probed=True)
+        return page_data, new_validators
 
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         # A 4xx or 5xx error is a perfect reason to try Playwright
         logger.warning(f"Simple scrape failed for {url} with HTTP error {e.response.status_code}. Trying Playwright.")
-        return _scrape_with_playwright(url)
+        return _fallback_to_playwright(url), {}
         
-    except requests.exceptions.RequestException as e:
+    except httpx.RequestError as e:
         # Other network errors (timeout, connection error)
         logger.error(f"Simple scrape failed for {url} ({e}). Trying Playwright.")
-        return _scrape_with_playwright(url)
+        return _fallback_to_playwright(url), {}
         
     except Exception as e:
         logger.error(f"An unexpected error occurred with simple scrape {url}. Error: {e}. Trying Playwright.")
-        return _scrape_with_playwright(url)
\ No newline at end of file
+        return _fallback_to_playwright(url), {}
+
+def _flight_key(url: str, use_cache: bool, skip_failing_domains: bool = True) -> str:
+    key = normalize_url(url)
+    if not use_cache:
+        key = f"{key}|nocache"
+    return key if skip_failing_domains else f"{key}|noskip"
+
+def scrape_page(url: str, use_cache: bool = True, skip_failing_domains: bool = True) -> PageData:
+    """
+    Scrapes a single page, using the persistent page cache when possible.
+    If the same page is already being scraped (by any job), waits for
+    that result instead of fetching it again.
+    """
+    return scrape_flights.do(_flight_key(url, use_cache, skip_failing_domains),
+                             _scrape_page, url, use_cache, skip_failing_domains)
+
+def _scrape_page(url: str, use_cache: bool = True, skip_failing_domains: bool = True) -> PageData:
+    """
+    A fresh cache hit skips both the network fetch and HTML parsing;
+    an expired entry is revalidated with a conditional request.
+    """
+    logger.info(f"Starting scrape for URL: {url}")
+
+    cache_key = normalize_url(url)
+    cached = page_cache.get(cache_key, allow_stale=True) if use_cache else None
+
+    if cached and not cached.expired:
+        logger.info(f"Cache hit for {url}")
+        return PageData.model_validate(cached.value["page"])
+
+    validators = cached.value.get("validators") if cached else None
+    page_data, validators = _fetch_page(url, validators, skip_failing_domains)
+
+    if page_data is None:
+        # 304 Not Modified: the cached parse is still valid
+        page_cache.touch(cache_key)
+        return PageData.model_validate(cached.value["page"])
+
+    if use_cache and not page_data.error:
+        page_cache.set(cache_key, {
+            "page": page_data.model_dump(mode="json"),
+            "validators": validators
+        })
+
+    return page_data
+
+def _get_host_semaphore(url: str) -> threading.BoundedSemaphore:
+    """Returns the (shared) semaphore limiting concurrent scrapes for this URL's host."""
+    host = urlparse(url).netloc.lower()
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_SCRAPES_PER_HOST)
+        return _host_semaphores[host]
+
+def _scrape_page_with_limits(url: str, skip_failing_domains: bool = True) -> PageData:
+    """
+    Runs the scrape under the per-host and global limits.
+    The host slot is taken first so a busy host doesn't hold a global slot while waiting.
+    """
+    with _get_host_semaphore(url):
+        with _global_semaphore:
+            return _scrape_page(url, skip_failing_domains=skip_failing_domains)
+
+def _scrape_with_limits(url: str, skip_failing_domains: bool = True) -> PageData:
+    # Coalesce before taking any slot, so a job waiting on another job's
+    # scrape of the same page doesn't hold a slot it isn't using.
+    try:
+        return scrape_flights.do(_flight_key(url, True, skip_failing_domains),
+                                 _scrape_page_with_limits, url, skip_failing_domains)
+    except Exception as e:
+        logger.error(f"Unexpected error while scraping {url}. Error: {e}")
+        return PageData(url=url, status_code=500, error=f"Scrape error: {e}")
+
+def scrape_pages(urls: List[str], max_workers: int = MAX_CONCURRENT_SCRAPES,
+                 on_page: Optional[Callable[[int, PageData], None]] = None,
+                 always_fetch: Iterable[str] = ()) -> List[PageData]:
+    """
+    Scrapes several pages concurrently.
+    Results are returned in the same order as the input URLs, so the total
+    time is set by the slowest page rather than the sum of all pages.
+    `on_page(index, page)` is called as each page finishes, in completion order.
+    URLs in `always_fetch` (e.g. the job's target page) are fetched even if
+    their domain has been failing.
+    """
+    if not urls:
+        return []
+
+    workers = max(1, min(max_workers, len(urls)))
+    logger.info(f"Scraping {len(urls)} pages with {workers} workers.")
+
+    pages: List[Optional[PageData]] = [None] * len(urls)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as executor:
+        required = set(always_fetch)
+        futures = {executor.submit(_scrape_with_limits, url, url not in required): i for i, url in enumerate(urls)}
+        for future in as_completed(futures):
+            i = futures[future]
+            pages[i] = future.result()
+            if on_page is not None:
+                on_page(i, pages[i])
+    return pages
@@ -1,11 +1,16 @@
 # backend/app/services/search_service.py
 
 import os
+import re
 import logging
+import threading
+import httplib2
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 from urllib.parse import urlparse
+from app.services.cache import TTLCache
+from app.services.singleflight import SingleFlight
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,6 +23,20 @@ logger = logging.getLogger(__name__)
 API_KEY = os.getenv("GOOGLE_API_KEY")
 CX = os.getenv("GOOGLE_CX")
 
+# --- Result Cache ---
+# Filtered results per normalized query. Saves Phase 1 latency and paid API quota.
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(60 * 60)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+
+search_cache = TTLCache(ttl_seconds=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+
+# Concurrent jobs running the same query share one API call
+search_flights = SingleFlight("search")
+
+# The Custom Search service object is built once and reused
+_service = None
+_service_lock = threading.Lock()
+
 # Domains to ignore (Google-owned, social media, trackers, etc.)
 BLACKLISTED_DOMAINS = [
     "google.com",
@@ -33,28 +52,51 @@ BLACKLISTED_DOMAINS = [
     "t.co",
 ]
 
+def normalize_query(query: str) -> str:
+    """Lowercases a query and collapses whitespace, for use as a cache key."""
+    return re.sub(r'\s+', ' ', query).strip().lower()
+
+def _get_service():
+    """Builds the Custom Search service object on first use and reuses it."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = build("customsearch", "v1", developerKey=API_KEY, cache_discovery=False)
+        return _service
+
 def get_search_results(query: str, num_results: int = 3) -> dict:
     """
     Fetches Google search results using the official Custom Search JSON API.
+    Filtered results are cached per normalized query, and concurrent calls
+    for the same normalized query share one API call.
     """
-    
+    cache_key = f"{normalize_query(query)}|{num_results}"
+    result = search_flights.do(cache_key, _search, query, num_results, cache_key)
+    return {**result, "query": query}
+
+def _search(query: str, num_results: int, cache_key: str) -> dict:
     logger.info(f"Starting API search for query: '{query}'")
 
+    cached_results = search_cache.get(cache_key)
+    if cached_results is not None:
+        logger.info(f"Search cache hit for query: '{query}'")
+        return {"query": query, "results": [dict(r) for r in cached_results]}
+
     if not API_KEY or not CX:
         logger.error("GOOGLE_API_KEY or GOOGLE_CX not found in .env file.")
         return {"query": query, "results": []}
 
     try:
-        # Build the service object
-        service = build("customsearch", "v1", developerKey=API_KEY)
+        service = _get_service()
         
         # Make the API call
-        # We ask for more than num_results to have candidates for filtering
+        # We ask for more than num_results to have candidates for filtering.
+        # httplib2 is not thread-safe, so each call gets its own Http object.
         res = service.cse().list(
             q=query,
             cx=CX,
             num=10  # Ask for 10 results to filter from
-        ).execute()
+        ).execute(http=httplib2.Http(timeout=10))
 
     except HttpError as e:
         logger.error(f"Google API HttpError: {e}")
@@ -111,6 +153,9 @@ def get_search_results(query: str, num_results: int = 3) -> dict:
             continue
 
     logger.info(f"Found {len(final_results)} valid results.")
+
+    if final_results:
+        search_cache.set(cache_key, [dict(r) for r in final_results])
     
     return {
         "query": query,
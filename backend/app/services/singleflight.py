@@ -0,0 +1,86 @@
+# backend/app/services/singleflight.py
+
+import copy
+import threading
+import logging
+from typing import Any, Callable, Dict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: while a call for `key` is
+    in flight, other callers wait for its result instead of doing the work
+    again. Waiters get a deep copy, so no two jobs share a mutable result.
+    The leader snapshots its result before waking them, since it goes on to
+    use (and may modify) the original.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {"executed": 0, "coalesced": 0}
+        _groups[name] = self
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+            else:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            logger.info(f"[{self.name}] Waiting for in-flight call: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                # No more waiters can join once the call is removed
+                waiters = call.waiters
+            if waiters and call.error is None:
+                try:
+                    call.result = copy.deepcopy(result)
+                except Exception as e:
+                    call.error = e
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Coalescing metrics for every group, for the health endpoint."""
+    return {name: group.stats() for name, group in _groups.items()}
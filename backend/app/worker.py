@@ -0,0 +1,50 @@
+# backend/app/worker.py
+#
+# A job executor without the API. Takes analysis jobs from the shared queue
+# and writes their status and reports to the shared job store, so workflows
+# can run on more cores (or machines) than the API processes.
+#
+# Run with:  JOB_QUEUE=sqlite JOB_STORE=sqlite python -m app.worker
+
+import signal
+import logging
+import threading
+
+from app.services import browser_pool
+from app.services import cpu_pool
+from app.services import http_client
+from app.services.job_queue import job_queue
+from app.services.job_store import job_store
+from app.workflow import run_analysis_workflow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    if job_queue.backend == "local":
+        raise SystemExit("app.worker needs a shared queue. Set JOB_QUEUE=sqlite (and JOB_STORE=sqlite).")
+    if job_store.backend == "memory":
+        logger.warning("JOB_STORE=memory: results written by this worker are invisible to the API.")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    browser_pool.get_pool()
+    cpu_pool.start_pool()
+    http_client.get_client()
+    job_queue.start(run_analysis_workflow)
+    logger.info("Worker started. Waiting for jobs.")
+
+    stop.wait()
+
+    logger.info("Worker stopping after current jobs.")
+    job_queue.shutdown(timeout=60)
+    browser_pool.shutdown_pool()
+    cpu_pool.shutdown_pool()
+    http_client.close_client()
+
+
+if __name__ == "__main__":
+    main()
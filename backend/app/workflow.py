@@ -0,0 +1,142 @@
+# backend/app/workflow.py
+
+import time
+import logging
+from typing import Any, Dict, List
+
+from app.services import search_service
+from app.services import scraper
+from app.services import features
+from app.services import llm_engine
+from app.services.job_store import job_store
+from app.models.page_data import PageData
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.monotonic() - since) * 1000, 1)
+
+def _publish(job_id: str, event: str, **data: Any):
+    """Adds a progress event for the job (streamed by /results/{job_id}/events)."""
+    try:
+        job_store.add_event(job_id, event, data)
+    except Exception as e:
+        # Progress events are best-effort; never fail the job over one
+        logger.error(f"Job {job_id}: Could not publish '{event}' event. Error: {e}")
+
+# --- The Main Workflow (Run by the Job Queue) ---
+
+def run_analysis_workflow(job_id: str, query: str, target_url: str, bypass_cache: bool = False):
+    """
+    This is the core function that runs all our phases.
+    It is executed by a job queue worker, and publishes an event as each phase finishes.
+    """
+    started = time.monotonic()
+    timings: Dict[str, float] = {}
+    try:
+        # Update job status
+        job_store.update(job_id, status="RUNNING")
+        _publish(job_id, "running")
+        logger.info(f"Job {job_id}: Workflow started. Query: '{query}', Target: {target_url}")
+
+        # --- Phase 1: Search ---
+        logger.info(f"Job {job_id}: Starting Phase 1 (Search)")
+        phase_started = time.monotonic()
+        search_results = search_service.get_search_results(query, num_results=7)
+        if not search_results.get("results"):
+            raise Exception("Phase 1 failed: No search results found.")
+        
+        competitor_urls = [r["url"] for r in search_results["results"]]
+        logger.info(f"Job {job_id}: Found competitors: {competitor_urls}")
+        timings["search_ms"] = _elapsed_ms(phase_started)
+        _publish(job_id, "search_done", competitors=competitor_urls, elapsed_ms=timings["search_ms"])
+
+        # --- Phase 2 & 3: Scrape ---
+        logger.info(f"Job {job_id}: Starting Phase 2/3 (Scraping)")
+        
+        # Scrape the target and all competitors concurrently (results keep input order)
+        phase_started = time.monotonic()
+
+        def on_page(index: int, page: PageData):
+            # Index 0 is the target; competitor N is index N
+            _publish(job_id, "page_scraped",
+                     index=index, total=len(competitor_urls) + 1, url=str(page.url),
+                     is_target=index == 0, error=page.error, elapsed_ms=_elapsed_ms(phase_started))
+
+        # The target is never skipped, even if its domain has been failing
+        scraped_pages = scraper.scrape_pages([target_url] + competitor_urls, on_page=on_page, always_fetch=[target_url])
+        timings["scrape_ms"] = _elapsed_ms(phase_started)
+
+        target_page = scraped_pages[0]
+        if target_page.error:
+            logger.warning(f"Job {job_id}: Target page scrape failed: {target_page.error}. Continuing...")
+            # We can still analyze competitors
+
+        competitor_pages: List[PageData] = []
+        for url, page in zip(competitor_urls, scraped_pages[1:]):
+            if not page.error:
+                competitor_pages.append(page)
+            else:
+                logger.warning(f"Job {job_id}: Competitor scrape failed: {url}. Skipping.")
+        
+        if not competitor_pages:
+             raise Exception("Phase 2 failed: Could not scrape any competitor pages.")
+        _publish(job_id, "scrape_done", scraped=len(competitor_pages), failed=len(competitor_urls) - len(competitor_pages),
+                 target_ok=not target_page.error, elapsed_ms=timings["scrape_ms"])
+
+        # --- Phase 4: Feature Extraction ---
+        logger.info(f"Job {job_id}: Starting Phase 4 (Feature Extraction)")
+        phase_started = time.monotonic()
+        
+        all_pages = [target_page] + competitor_pages
+        # Per-page features plus TF-IDF distinctive terms (in the CPU pool, if enabled);
+        # failed scrapes get empty placeholders
+        all_features = features.extract_job_features(all_pages, top_k=20)
+
+        target_features = all_features[0]
+        competitor_features = all_features[1:]
+        timings["features_ms"] = _elapsed_ms(phase_started)
+        _publish(job_id, "features_done", elapsed_ms=timings["features_ms"])
+
+        # --- Phase 5: LLM Comparison ---
+        logger.info(f"Job {job_id}: Starting Phase 5 (LLM Analysis)")
+        phase_started = time.monotonic()
+        published_nodes = set()
+
+        def on_node(name: str, value: Any):
+            # Each report node goes to the client as soon as the model finishes it
+            published_nodes.add(name)
+            _publish(job_id, "node", name=name, data=value, elapsed_ms=_elapsed_ms(phase_started))
+        
+        report = llm_engine.get_llm_recommendations(
+            target_page=target_page,
+            target_features=target_features,
+            competitor_pages=competitor_pages,
+            competitor_features=competitor_features,
+            use_cache=not bypass_cache,
+            on_node=on_node,
+            job_id=job_id
+        )
+        
+        if "error" in report:
+            raise Exception(f"Phase 5 failed: {report['error']}")
+        # Cached or shared reports arrive whole; publish whatever wasn't streamed
+        for name, value in report.items():
+            if name not in published_nodes:
+                on_node(name, value)
+        timings["llm_ms"] = _elapsed_ms(phase_started)
+        _publish(job_id, "llm_done", elapsed_ms=timings["llm_ms"])
+
+        # --- Phase 6: Report Complete ---
+        logger.info(f"Job {job_id}: Workflow complete. Storing report.")
+        timings["total_ms"] = _elapsed_ms(started)
+        job_store.update(job_id, status="COMPLETE", report=report)
+        # The stream attaches the stored report to this event
+        _publish(job_id, "complete", timings=timings)
+
+    except Exception as e:
+        logger.error(f"Job {job_id}: Workflow failed. Error: {e}")
+        timings["total_ms"] = _elapsed_ms(started)
+        job_store.update(job_id, status="FAILED", error=str(e))
+        _publish(job_id, "failed", error=str(e), timings=timings)
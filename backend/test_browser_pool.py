@@ -0,0 +1,48 @@
+# backend/test_browser_pool.py
+#
+# Renders never hang the caller: a pool whose Playwright can't start fails
+# them, and a stuck render times out.
+
+import time
+import pytest
+from app.services import browser_pool
+
+
+def _failing_playwright():
+    raise RuntimeError("Playwright driver missing")
+
+
+class _IdlePlaywright:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_run_fails_when_playwright_cannot_start(monkeypatch):
+    monkeypatch.setattr(browser_pool, "sync_playwright", _failing_playwright)
+    pool = browser_pool.BrowserPool(size=2)
+    started = time.monotonic()
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="no running workers"):
+            pool.run(lambda context: None, timeout=5)
+    assert time.monotonic() - started < 5
+
+
+def test_run_times_out(monkeypatch):
+    monkeypatch.setattr(browser_pool, "sync_playwright", _IdlePlaywright)
+    pool = browser_pool.BrowserPool(size=1)
+    # A worker that never gets to the queued render
+    monkeypatch.setattr(pool, "_serve", lambda p: time.sleep(1))
+    with pytest.raises(TimeoutError):
+        pool.run(lambda context: None, timeout=0.2)
+
+
+if __name__ == "__main__":
+    print(f"--- Testing Browser Pool Failure Handling ---")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_run_fails_when_playwright_cannot_start(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_run_times_out(monkeypatch)
+    print(f"\n--- Testing Complete ---")
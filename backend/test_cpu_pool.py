@@ -0,0 +1,79 @@
+# backend/test_cpu_pool.py
+#
+# Parsing and feature extraction give the same results in the CPU pool's
+# worker processes as inline. In-memory caches are per process; the IDF
+# corpus is shared through disk.
+
+import os
+import pytest
+from app.services import cpu_pool, features, scraper
+from app.services.idf_corpus import IDFCorpus
+from test_tokenizer import FIXTURE_CORPUS
+
+
+def _html(i: int) -> bytes:
+    body = "".join(f"<p>{text}</p>" for text in FIXTURE_CORPUS)
+    script = '<script type="application/ld+json">{"@type": "Course"}</script>'
+    return f"<html><head><title>Course {i}</title>{script}</head><body><h1>Course {i}</h1><main>{body}</main></body></html>".encode()
+
+
+def _job():
+    pages = [scraper._parse_html(f"https://example.ac.uk/{i}", _html(i), 200) for i in range(3)]
+    return [page.model_dump() for page in pages], [f.model_dump() for f in features.extract_job_features(pages)]
+
+
+def test_pool_matches_inline(monkeypatch):
+    # Per-job TF-IDF, so the result doesn't depend on the shared corpus
+    monkeypatch.setenv("IDF_CORPUS", "0")
+    monkeypatch.setattr(features, "IDF_CORPUS_ENABLED", False)
+    inline = _job()
+
+    monkeypatch.setattr(cpu_pool, "CPU_POOL_WORKERS", 1)
+    try:
+        cpu_pool.start_pool()
+        tasks_before = cpu_pool.pool_stats()["tasks"]
+        assert _job() == inline
+        # Three pages parsed, one feature task for the job
+        assert cpu_pool.pool_stats()["tasks"] - tasks_before == 4
+    finally:
+        cpu_pool.shutdown_pool()
+
+
+def _document_cache_view():
+    # Runs in a worker: its own process and document cache
+    return os.getpid(), features.document_cache.stats()["entries"]
+
+
+def test_worker_caches_are_per_process(monkeypatch, tmp_path):
+    # Workers are spawned with this environment, so they open the same corpus
+    monkeypatch.setenv("IDF_CORPUS", "1")
+    monkeypatch.setenv("IDF_CORPUS_DIR", str(tmp_path))
+    monkeypatch.setattr(features, "IDF_CORPUS_ENABLED", True)
+    monkeypatch.setattr(features, "idf_corpus", IDFCorpus(str(tmp_path)))
+    monkeypatch.setattr(cpu_pool, "CPU_POOL_WORKERS", 1)
+    features.document_cache.clear()
+    try:
+        cpu_pool.start_pool()
+        _job()
+        worker_pid, worker_entries = cpu_pool.run(_document_cache_view)
+    finally:
+        cpu_pool.shutdown_pool()
+
+    # The documents were analyzed and cached in the worker, not here
+    assert worker_pid != os.getpid()
+    assert worker_entries > 0
+    assert features.document_cache.stats()["entries"] == 0
+    # The corpus the worker wrote is the one this process reads
+    assert IDFCorpus(str(tmp_path)).stats()["documents"] == 3
+
+
+if __name__ == "__main__":
+    print(f"--- Testing CPU Pool ---")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_pool_matches_inline(monkeypatch)
+    print(f"Pool and inline results match: {cpu_pool.pool_stats()}")
+    import tempfile
+    with pytest.MonkeyPatch.context() as monkeypatch, tempfile.TemporaryDirectory() as tmp:
+        test_worker_caches_are_per_process(monkeypatch, tmp)
+    print("Worker caches are per process; the IDF corpus is shared.")
+    print(f"\n--- Testing Complete ---")
@@ -0,0 +1,50 @@
+# backend/test_document.py
+#
+# A page is tokenized once, however many feature stages read it.
+
+from app.services import features
+from app.models.page_data import PageData
+from test_tokenizer import FIXTURE_CORPUS
+
+
+def test_each_page_is_tokenized_once(monkeypatch):
+    calls = []
+    tokenize = features._clean_and_tokenize
+    monkeypatch.setattr(features, "_clean_and_tokenize", lambda text, *args: calls.append(text) or tokenize(text, *args))
+    monkeypatch.setattr(features, "document_cache", features.TTLCache(ttl_seconds=60, max_entries=16))
+
+    pages = [PageData(url=f"https://example.ac.uk/{i}", status_code=200, main_content=text) for i, text in enumerate(FIXTURE_CORPUS)]
+    for page in pages:
+        features.extract_features_from_page(page)
+    features.calculate_tf_idf([page.main_content for page in pages])
+
+    assert sorted(calls) == sorted(FIXTURE_CORPUS)
+
+
+def test_document_features_match_the_token_functions():
+    for text in FIXTURE_CORPUS:
+        doc = features.AnalyzedDocument(text)
+        tokens = features._clean_and_tokenize(text)
+        assert doc.tokens == tokens
+        assert doc.word_count == len(text.split())
+        assert doc.keyword_densities(20) == features.calculate_keyword_densities(tokens, top_n=20)
+        assert [doc.vocab[i] for i in doc.token_ids] == tokens
+
+
+def test_document_cache_is_bounded_by_size(monkeypatch):
+    text_budget = 3000  # characters of text the cache may hold
+    cache = features.TTLCache(ttl_seconds=60, max_entries=128, max_bytes=text_budget * features.DOCUMENT_BYTES_PER_CHAR)
+    monkeypatch.setattr(features, "document_cache", cache)
+
+    pages = [f"page {i} " + "course " * 200 for i in range(10)]  # about 1400 characters each
+    for text in pages:
+        features.analyze(text)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    # The most recent pages are the ones kept
+    assert features.analyze(pages[-1]) is features.analyze(pages[-1])
+
+    # A page bigger than the whole budget is analyzed but not cached
+    huge = "course " * 1000
+    assert features.analyze(huge).word_count == 1000
+    assert features.analyze(huge) is not features.analyze(huge)
@@ -0,0 +1,65 @@
+# backend/test_domain_strategy.py
+#
+# Only failures that blame the whole domain count towards skipping it, and
+# a job's target page is fetched even on a domain marked "skip".
+
+import os
+import tempfile
+from app.models.page_data import PageData
+from app.services import domain_strategy, scraper
+from app.services.cache import DiskCache
+
+TARGET = "https://www.example.ac.uk/course"
+COMPETITOR = "https://www.example.ac.uk/other-course"
+
+
+def _fresh_store(monkeypatch):
+    store = DiskCache("domain_strategies", ttl_seconds=3600, max_entries=100)
+    store.path = os.path.join(tempfile.mkdtemp(), "domain_strategies.sqlite3")
+    monkeypatch.setattr(domain_strategy, "_store", store)
+
+
+def _playwright_returns(monkeypatch, status_code, error):
+    def render(url):
+        if error:
+            return PageData(url=url, status_code=status_code, error=error)
+        return PageData(url=url, status_code=status_code, h1="Course", word_count=500)
+    monkeypatch.setattr(scraper, "_scrape_with_playwright", render)
+
+
+def test_missing_pages_do_not_mark_the_domain(monkeypatch):
+    _fresh_store(monkeypatch)
+    _playwright_returns(monkeypatch, 404, "Playwright received status 404")
+    for _ in range(5):
+        scraper._fallback_to_playwright(COMPETITOR)
+    assert domain_strategy.predict_strategy(TARGET) == domain_strategy.STRATEGY_SIMPLE
+
+
+def test_blocked_domain_is_skipped(monkeypatch):
+    _fresh_store(monkeypatch)
+    for status_code in (403, 429, 503, 408):
+        _playwright_returns(monkeypatch, status_code, f"Playwright received status {status_code}")
+        scraper._fallback_to_playwright(COMPETITOR)
+    assert domain_strategy.predict_strategy(TARGET) == domain_strategy.STRATEGY_SKIP
+
+
+def test_target_is_fetched_on_a_skipped_domain(monkeypatch):
+    monkeypatch.setattr(domain_strategy, "predict_strategy", lambda url: domain_strategy.STRATEGY_SKIP)
+    monkeypatch.setattr(domain_strategy, "record_outcome", lambda url, outcome, probed: None)
+    monkeypatch.setattr(scraper, "page_cache", DiskCache("pages", ttl_seconds=60, max_entries=10))
+    scraper.page_cache.path = os.path.join(tempfile.mkdtemp(), "pages.sqlite3")
+    _playwright_returns(monkeypatch, 200, None)
+
+    target, competitor = scraper.scrape_pages([TARGET, COMPETITOR], always_fetch=[TARGET])
+    assert target.error is None
+    assert competitor.error == "Skipped: domain has been failing consistently"
+
+
+if __name__ == "__main__":
+    import pytest
+    print(f"--- Testing Domain Strategy ---")
+    for test in (test_missing_pages_do_not_mark_the_domain, test_blocked_domain_is_skipped,
+                 test_target_is_fetched_on_a_skipped_domain):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            test(monkeypatch)
+    print(f"\n--- Testing Complete ---")
@@ -0,0 +1,109 @@
+# backend/test_extractor.py
+
+from bs4 import BeautifulSoup
+from app.services import extractor
+from app.services.fast_extractor import extract_all
+from app.services.scraper import _declared_encoding
+
+# A small but messy course page: nested noise, comments, scripts inside
+# headings, relative/anchor/javascript links, JSON-LD in the body, etc.
+FIXTURE_PAGES = {
+    "course_page": """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>MSc Data Science | Example University</title>
+  <meta name="description" content="  Study data science in London.  ">
+  <meta name="keywords" content="data science, msc, machine learning">
+  <link rel="stylesheet" href="/style.css">
+  <link rel="canonical" href=" https://example.ac.uk/msc-data-science ">
+  <script type="application/ld+json">{"@type": "Course", "name": "MSc Data Science"}</script>
+  <style>body { color: red; }</style>
+</head>
+<body>
+  <header><nav><a href="/">Home</a> <a href="#main">Skip</a></nav><h2>Header heading</h2></header>
+  <main>
+    <h1>MSc <span>Data</span> Science<script>var x = 1;</script></h1>
+    <!-- hero -->Intro text<p>Learn <b>machine learning</b>, statistics and AI.</p>
+    <aside>Related courses</aside>
+    <h2>Modules</h2>
+    <ul><li>Deep Learning</li><li>Big&nbsp;Data</li></ul>
+    <img src="a.png" alt="  Students   in a lab "><img src="b.png" alt=""><img src="c.png">
+    <a href="javascript:void(0)">Open</a>
+    <a href="/apply">Apply <em>now</em></a>
+    <a href="">Empty</a>
+    <script type="application/ld+json">{"@type": "FAQPage"}</script>
+    <script type="application/ld+json">{not json}</script>
+    <h3>Entry requirements</h3>
+  </main>
+  <footer><a href="/contact">Contact</a><h4>Footer</h4></footer>
+</body>
+</html>""",
+    "no_main": """<html><head><title></title></head>
+<body><div>Body text<nav>menu</nav> after nav</div><h1>  First   H1 </h1><h1>Second</h1>
+<a href="https://other.ac.uk/x"><img alt="logo"> Other</a></body></html>""",
+    "empty": "",
+}
+
+
+def _reference_fields(html: str) -> dict:
+    """Runs every extractor function over one shared soup."""
+    soup = BeautifulSoup(html, 'lxml')
+    return {
+        "main_content": extractor.extract_main_content(soup),  # first, to prove it has no side effects
+        "title": extractor.extract_title(soup),
+        "meta_description": extractor.extract_meta_description(soup),
+        "meta_keywords": extractor.extract_meta_keywords(soup),
+        "canonical_url": extractor.extract_canonical_url(soup),
+        "headings": extractor.extract_headings(soup),
+        "json_ld": extractor.extract_json_ld(soup),
+        "links": extractor.extract_links(soup),
+        "image_alt_texts": extractor.extract_image_alt_texts(soup),
+    }
+
+
+def test_extractor_parity():
+    for name, html in FIXTURE_PAGES.items():
+        expected = _reference_fields(html)
+        actual = extract_all(html)
+        for field, value in expected.items():
+            assert actual[field] == value, f"{name}.{field}: {actual[field]!r} != {value!r}"
+
+
+def test_main_content_does_not_modify_soup():
+    for name, html in FIXTURE_PAGES.items():
+        soup = BeautifulSoup(html, 'lxml')
+        before = str(soup)
+        extractor.extract_main_content(soup)
+        assert str(soup) == before, f"{name}: extract_main_content changed the soup"
+
+
+def test_declared_cjk_encodings_parse():
+    text = {"EUC-KR": "데이터 과학", "EUC-JP": "データサイエンス", "ISO-2022-JP": "データサイエンス"}
+    for charset, title in text.items():
+        html = f"<html><head><title>{title}</title></head><body><p>{title}</p></body></html>".encode(charset)
+        encoding = _declared_encoding(f"text/html; charset={charset}")
+        assert encoding == charset
+        assert extract_all(html, encoding)["title"] == title
+
+
+def test_encoding_unknown_to_libxml2_falls_back_to_sniffing():
+    # A Python codec name that libxml2 doesn't accept
+    html = "<html><head><title>Café</title></head></html>".encode("utf-8")
+    assert extract_all(html, "euc_kr")["title"] == "Café"
+
+
+if __name__ == "__main__":
+    print(f"--- Testing Single-Pass Extractor Parity ---")
+
+    failures = 0
+    for name, html in FIXTURE_PAGES.items():
+        expected = _reference_fields(html)
+        actual = extract_all(html)
+        for field, value in expected.items():
+            if actual[field] != value:
+                failures += 1
+                print(f"MISMATCH {name}.{field}:\n  fast:   {actual[field]!r}\n  bs4:    {value!r}")
+        print(f"{name}: checked {len(expected)} fields")
+
+    print(f"\n--- Testing Complete ({failures} mismatches) ---")
@@ -0,0 +1,62 @@
+# backend/test_http_client.py
+#
+# The pooled transport builds one connection pool, honours the usual
+# HTTPTransport settings, and resolves hosts through the DNS cache.
+
+import threading
+import pytest
+import httpx
+import httpcore
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services.http_client import _CachingDNSBackend, _PooledTransport, dns_cache
+
+
+class _Hello(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "5")
+        self.end_headers()
+        self.wfile.write(b"hello")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_builds_one_pool_with_the_given_settings(monkeypatch):
+    pools = []
+    original_init = httpcore.ConnectionPool.__init__
+
+    def counting_init(self, *args, **kwargs):
+        pools.append(self)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(httpcore.ConnectionPool, "__init__", counting_init)
+    transport = _PooledTransport(http2=False, limits=httpx.Limits(max_connections=7), retries=2,
+                                 local_address="0.0.0.0")
+    assert pools == [transport._pool]
+    assert transport._pool._max_connections == 7
+    assert transport._pool._retries == 2
+    assert transport._pool._local_address == "0.0.0.0"
+    assert isinstance(transport._pool._network_backend, _CachingDNSBackend)
+
+
+def test_requests_resolve_through_the_dns_cache():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Hello)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        misses = dns_cache.stats()["misses"]
+        with httpx.Client(transport=_PooledTransport()) as client:
+            for _ in range(2):
+                assert client.get(f"http://localhost:{server.server_port}/").text == "hello"
+        assert dns_cache.stats()["misses"] == misses + 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    print(f"--- Testing Pooled HTTP Transport ---")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_builds_one_pool_with_the_given_settings(monkeypatch)
+    test_requests_resolve_through_the_dns_cache()
+    print(f"\n--- Testing Complete ---")
@@ -0,0 +1,104 @@
+# backend/test_idf_corpus.py
+#
+# The persistent IDF corpus: incremental adds, replacing re-scraped pages,
+# compaction, and scores matching a full TF-IDF refit.
+
+import os
+import sqlite3
+import tempfile
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.services.idf_corpus import IDFCorpus
+from app.services import features
+from app.services.features import AnalyzedDocument, _clean_and_tokenize
+from test_tokenizer import FIXTURE_CORPUS
+
+
+def _corpus(**kwargs):
+    return IDFCorpus(directory=tempfile.mkdtemp(prefix="idf_corpus_"), **kwargs)
+
+
+def _terms(text):
+    return AnalyzedDocument(text).term_counts
+
+
+def test_document_frequencies_match_a_refit():
+    corpus = _corpus()
+    for i, text in enumerate(FIXTURE_CORPUS):
+        assert corpus.add_document(f"https://example.ac.uk/{i}", _terms(text))
+
+    vectorizer = TfidfVectorizer(tokenizer=_clean_and_tokenize, lowercase=False, token_pattern=None, ngram_range=(1, 3))
+    matrix = vectorizer.fit_transform(FIXTURE_CORPUS)
+    expected_df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+
+    total, df = corpus.document_frequencies(vectorizer.get_feature_names_out())
+    assert total == len(FIXTURE_CORPUS)
+    # Hash collisions can only add to a bucket's count
+    assert (df >= expected_df).all()
+    assert (df == expected_df).mean() > 0.99
+
+
+def test_readding_and_replacing_pages():
+    corpus = _corpus()
+    assert corpus.add_document("https://example.ac.uk/a", _terms("data science masters"))
+    assert not corpus.add_document("https://example.ac.uk/a", _terms("data science masters"))
+    assert corpus.add_document("https://example.ac.uk/a", _terms("machine learning masters"))
+
+    total, df = corpus.document_frequencies(["data", "machine", "masters"])
+    assert total == 1
+    assert df.tolist() == [0, 1, 1]
+
+
+def test_compaction_drops_oldest_and_reloads_in_other_processes():
+    directory = tempfile.mkdtemp(prefix="idf_corpus_")
+    writer = IDFCorpus(directory=directory, max_documents=2)
+    reader = IDFCorpus(directory=directory)
+    for i, text in enumerate(["alpha beta", "beta gamma", "gamma delta"]):
+        writer.add_document(f"https://example.ac.uk/{i}", _terms(text))
+    assert reader.document_frequencies(["beta"])[1].tolist() == [2]
+
+    assert writer.compact() == {"removed": 1, "documents": 2}
+    # The reader picks up the rebuilt file
+    total, df = reader.document_frequencies(["alpha", "beta", "gamma"])
+    assert total == 2
+    assert df.tolist() == [0, 1, 2]
+
+
+def test_failed_add_leaves_counts_unchanged():
+    corpus = _corpus()
+    corpus.add_document("https://example.ac.uk/a", _terms("data science masters"))
+    corpus._connect().execute(
+        "CREATE TRIGGER reject_inserts BEFORE INSERT ON documents BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+    )
+    with pytest.raises(sqlite3.IntegrityError):
+        corpus.add_document("https://example.ac.uk/b", _terms("data engineering masters"))
+    total, df = corpus.document_frequencies(["data", "engineering", "science"])
+    assert total == 1
+    assert df.tolist() == [1, 0, 1]
+
+
+def test_stats_do_not_create_the_corpus():
+    corpus = _corpus()
+    assert corpus.stats()["documents"] == 0
+    assert not os.listdir(corpus.directory)
+
+
+def test_scores_match_per_job_tf_idf_on_the_same_pages(monkeypatch):
+    # With only these pages in the corpus, corpus IDF is the per-job IDF
+    urls = [f"https://example.ac.uk/{i}" for i in range(len(FIXTURE_CORPUS))]
+    for max_features in (None, 100, 5):
+        monkeypatch.setattr(features, "idf_corpus", _corpus())
+        corpus_tfidf = features.calculate_corpus_tf_idf(urls, FIXTURE_CORPUS, max_features=max_features, top_k=10)
+        job_tfidf = features.calculate_tf_idf(FIXTURE_CORPUS, max_features=max_features, top_k=10)
+        assert corpus_tfidf == job_tfidf
+
+
+if __name__ == "__main__":
+    print(f"--- Testing IDF Corpus ---")
+    test_document_frequencies_match_a_refit()
+    test_readding_and_replacing_pages()
+    test_compaction_drops_oldest_and_reloads_in_other_processes()
+    test_failed_add_leaves_counts_unchanged()
+    test_stats_do_not_create_the_corpus()
+    print(f"\n--- Testing Complete ---")
@@ -0,0 +1,108 @@
+# backend/test_job_events.py
+#
+# The SSE stream attaches the stored report to the "complete" event, even
+# when the job finishes between the stream's status read and event read.
+# The async endpoints keep job store I/O off the event loop.
+
+import json
+import asyncio
+import pytest
+from app import main
+from app.models.api_models import AnalyzeRequest
+from app.services.job_store import MemoryJobStore
+
+REPORT = {"final_scores": {"final_seo_score": 92}}
+
+
+class _CompletesAfterFirstGet(MemoryJobStore):
+    """Stores the report and publishes 'complete' right after the first get()."""
+
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, job_id):
+        job = super().get(job_id)
+        self.gets += 1
+        if self.gets == 1:
+            self.update(job_id, status="COMPLETE", report=REPORT)
+            self.add_event(job_id, "complete", {"timings": {}})
+        return job
+
+
+async def _collect(job_id):
+    return [message async for message in main._job_events(job_id, 0)]
+
+
+def test_complete_event_carries_the_report(monkeypatch):
+    store = _CompletesAfterFirstGet()
+    monkeypatch.setattr(main, "job_store", store)
+    store.create("job-1")
+    store.update("job-1", status="RUNNING")
+
+    messages = asyncio.run(_collect("job-1"))
+    assert len(messages) == 1
+    assert messages[0].startswith("id: 1\nevent: complete\n")
+    data = json.loads(messages[0].split("data: ", 1)[1])
+    assert data["report"] == REPORT
+
+
+def _assert_off_event_loop():
+    # SQLite stores can block for their whole lock timeout
+    with pytest.raises(RuntimeError):
+        asyncio.get_running_loop()
+
+
+class _OffLoopStore(MemoryJobStore):
+    """Fails any call made on the event loop thread."""
+
+    def create(self, job_id):
+        _assert_off_event_loop()
+        return super().create(job_id)
+
+    def get(self, job_id):
+        _assert_off_event_loop()
+        return super().get(job_id)
+
+    def delete(self, job_id):
+        _assert_off_event_loop()
+        return super().delete(job_id)
+
+
+class _FullQueue:
+    """A SQLite-like queue: fails calls made on the event loop thread."""
+
+    def __init__(self, full):
+        self.full = full
+
+    def submit(self, job_id, payload):
+        _assert_off_event_loop()
+        if self.full:
+            raise main.QueueFull(retry_after=5)
+
+    def position(self, job_id):
+        _assert_off_event_loop()
+        return 1
+
+
+def test_endpoints_keep_store_and_queue_calls_off_the_event_loop(monkeypatch):
+    store = _OffLoopStore()
+    monkeypatch.setattr(main, "job_store", store)
+    request = AnalyzeRequest(target_url="https://example.ac.uk/course", query="msc data science")
+
+    monkeypatch.setattr(main, "job_queue", _FullQueue(full=False))
+    job_id = asyncio.run(main.analyze(request)).job_id
+    assert asyncio.run(main.get_results(job_id)).queue_position == 1
+
+    monkeypatch.setattr(main, "job_queue", _FullQueue(full=True))
+    with pytest.raises(main.HTTPException):
+        asyncio.run(main.analyze(request))
+
+
+if __name__ == "__main__":
+    print(f"--- Testing Job Event Stream ---")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_complete_event_carries_the_report(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_endpoints_keep_store_and_queue_calls_off_the_event_loop(monkeypatch)
+    print(f"\n--- Testing Complete ---")
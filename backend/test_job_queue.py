@@ -0,0 +1,72 @@
+# backend/test_job_queue.py
+#
+# The SQLite queue requeues jobs whose worker died, but never a job that is
+# still running, however long it takes.
+
+import os
+import time
+import tempfile
+import threading
+import pytest
+from app.services.job_queue import SQLiteJobQueue, _WorkerPool
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_long_job_is_not_requeued():
+    path = os.path.join(tempfile.mkdtemp(), "queue.sqlite3")
+    runs = []
+    release = threading.Event()
+
+    def slow_handler(job_id, **payload):
+        runs.append(job_id)
+        release.wait(5)
+
+    owner = SQLiteJobQueue(path, workers=1, poll_interval=0.05, claim_timeout=0.3)
+    other = SQLiteJobQueue(path, workers=1, poll_interval=0.05, claim_timeout=0.3)
+    other.worker_id = "other-host:1"
+    owner.submit("job-1", {})
+    owner.start(slow_handler)
+    assert _wait_for(lambda: runs == ["job-1"])
+    other.start(slow_handler)
+    try:
+        # Three claim timeouts: without the heartbeat, the other worker would take it
+        time.sleep(1.0)
+        assert runs == ["job-1"]
+    finally:
+        release.set()
+        owner.shutdown()
+        other.shutdown()
+
+
+def test_dead_workers_job_is_requeued():
+    path = os.path.join(tempfile.mkdtemp(), "queue.sqlite3")
+    runs = []
+    queue = SQLiteJobQueue(path, workers=1, poll_interval=0.05, claim_timeout=0.3)
+    queue.submit("job-1", {})
+    queue._connect().execute(
+        "UPDATE queue SET claimed_by = 'crashed-host:1', claimed_at = ?", (time.time() - 1,)
+    )
+    queue.start(lambda job_id, **payload: runs.append(job_id))
+    try:
+        assert _wait_for(lambda: runs == ["job-1"])
+    finally:
+        queue.shutdown()
+
+
+def test_worker_pool_is_abstract():
+    with pytest.raises(TypeError):
+        _WorkerPool(1, 1)
+
+
+if __name__ == "__main__":
+    print(f"--- Testing SQLite Job Queue ---")
+    test_long_job_is_not_requeued()
+    test_dead_workers_job_is_requeued()
+    test_worker_pool_is_abstract()
+    print(f"\n--- Testing Complete ---")
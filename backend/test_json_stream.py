@@ -0,0 +1,47 @@
+# backend/test_json_stream.py
+
+import json
+from app.services.json_stream import TopLevelMemberParser
+
+# Shaped like an LLM report, with strings that look like JSON structure
+REPORT = {
+    "node_1_keywords": {"performance_score": 85, "must_have_keywords": ["data, science", "MSc {online}"]},
+    "node_2_competitors": {"top_competitors": [{"rank": 1, "url": "https://example.com/?a=1,b=2", "differentiator": "Says \"career-ready\" \\ often."}]},
+    "node_3_content_rewrite": {"title": "MSc Data Science", "why_choose_points": []},
+    "node_5_metadata": {"meta_title": "[Top] Data Science MSc", "meta_keywords": []},
+    "final_scores": {"final_seo_score": 92, "engagement_lift": 67},
+}
+
+
+def _stream(text: str, chunk_size: int):
+    parser = TopLevelMemberParser()
+    events = []
+    for i in range(0, len(text), chunk_size):
+        for member in parser.feed(text[i:i + chunk_size]):
+            events.append((i, member))
+    return parser, events
+
+
+def test_members_match_json_loads():
+    for text in (json.dumps(REPORT), json.dumps(REPORT, indent=2)):
+        for chunk_size in (1, 3, 16, len(text)):
+            parser, events = _stream(text, chunk_size)
+            assert parser.done
+            assert dict(member for _, member in events) == json.loads(text)
+
+
+def test_nodes_arrive_before_the_end():
+    text = json.dumps(REPORT)
+    _, events = _stream(text, 8)
+    first_offset, (first_name, _) = events[0]
+    assert first_name == "node_1_keywords"
+    assert first_offset < text.index('"node_2_competitors"')
+
+
+if __name__ == "__main__":
+    print(f"--- Testing Incremental JSON Parser ---")
+    text = json.dumps(REPORT, indent=2)
+    _, events = _stream(text, 8)
+    for offset, (name, _) in events:
+        print(f"{name}: ready after {min(offset + 8, len(text))}/{len(text)} chars")
+    print(f"\n--- Testing Complete ---")
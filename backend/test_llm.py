@@ -2,7 +2,10 @@
 
 import json
 import logging
-from app.services.llm_engine import get_llm_recommendations
+import threading
+from types import SimpleNamespace
+from app.services import llm_engine
+from app.services.llm_engine import NODE_PROMPTS, NODE_SPECS, get_llm_recommendations
 from app.models.page_data import PageData, ExtractedFeatures
 
 # Set logging level higher for a cleaner test output
@@ -10,6 +13,63 @@ logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger("app")
 logger.setLevel(logging.WARNING)
 
+
+# --- Per-node generation, with the model call stubbed out ---
+
+def _summary(url: str, keywords):
+    return {
+        "url": url, "title": f"Title of {url}", "meta_description": "A course.", "h1": "A Course",
+        "word_count": 800, "schema_types": ["Course"],
+        "top_keywords_with_density": [[k, 1.0] for k in keywords], "distinctive_terms": keywords[:1],
+    }
+
+class _StubCompletions:
+    """Answers each node's prompt with its example; malformed the first time for `flaky` nodes."""
+
+    def __init__(self, flaky):
+        self.flaky = set(flaky)
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def create(self, model, messages, **kwargs):
+        node = next(n for n, prompt in NODE_PROMPTS.items() if prompt == messages[0]["content"])
+        with self.lock:
+            self.requests.setdefault(node, []).append(json.loads(messages[1]["content"]))
+            attempt = len(self.requests[node])
+        content = "{not json" if node in self.flaky and attempt == 1 else json.dumps({node: NODE_SPECS[node]["example"]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def test_per_node_generation(monkeypatch):
+    completions = _StubCompletions(flaky=["node_3_content_rewrite"])
+    monkeypatch.setattr(llm_engine, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    # MODEL is only defined when an API key is configured
+    monkeypatch.setattr(llm_engine, "MODEL", "gpt-4o-mini", raising=False)
+    target = _summary("https://my-university.com/msc-data", ["data", "course"])
+    competitors = [
+        {"rank": 1, "url": "https://big-uni.com/ds", "title": "Data Science MSc",
+         "summary": _summary("https://big-uni.com/ds", ["data science", "machine learning"])},
+    ]
+    seen = []
+    report = llm_engine._generate_per_node(target, competitors, on_node=lambda node, value: seen.append(node))
+
+    # Merged in schema order, each node's value from its own completion
+    assert list(report) == list(NODE_SPECS)
+    assert report == {node: spec["example"] for node, spec in NODE_SPECS.items()}
+    assert sorted(seen) == sorted(NODE_SPECS)
+
+    # Each node was sent only its slice of the summaries
+    requests = completions.requests
+    assert requests["node_1_keywords"][0] == {"target": target, "competitor_keywords": [["data science", "machine learning"]]}
+    assert requests["node_2_competitors"][0]["competitors"][0]["top_keywords"] == ["data science", "machine learning"]
+    assert "target" not in requests["node_2_competitors"][0]
+    assert set(requests["node_5_metadata"][0]["target"]) == {"url", "title", "meta_description", "h1", "word_count", "top_keywords"}
+    assert requests["node_5_metadata"][0]["competitor_titles"] == ["Data Science MSc"]
+
+    # Only the failing node was retried
+    assert {node: len(calls) for node, calls in requests.items()} == {
+        node: 2 if node == "node_3_content_rewrite" else 1 for node in NODE_SPECS
+    }
+
 if __name__ == "__main__":
     print(f"--- Testing LLM Engine (Phase 5) ---")
     
@@ -0,0 +1,77 @@
+# backend/test_ngrams.py
+#
+# Checks the integer n-gram engine against the original string-keyed
+# implementation and benchmarks both on a long page.
+# Run directly for the benchmark:  python test_ngrams.py
+
+import time
+import random
+from collections import Counter
+from nltk.util import ngrams
+from app.services.features import calculate_keyword_densities
+
+
+def reference_densities(tokens, top_n=50):
+    """The original implementation: every n-gram as a string, full sort."""
+    if not tokens:
+        return {}
+    total_words = len(tokens)
+    densities = {}
+    for n in (1, 2, 3):
+        for gram, count in Counter(ngrams(tokens, n)).items():
+            densities[" ".join(gram)] = (count / total_words) * 100
+    sorted_densities = sorted(densities.items(), key=lambda item: item[1], reverse=True)
+    return dict(sorted_densities[:top_n])
+
+
+def _page(words: int, vocab: int, seed: int):
+    rng = random.Random(seed)
+    # Zipf-like, like real text: a few very common words, a long tail
+    vocabulary = [f"word{i}" for i in range(vocab)]
+    weights = [1 / (i + 1) for i in range(vocab)]
+    return rng.choices(vocabulary, weights=weights, k=words)
+
+
+def _same(a, b):
+    # Same keys, same order, same values
+    return list(a.items()) == list(b.items())
+
+
+def test_matches_reference_output():
+    cases = [
+        [],
+        ["data"],
+        ["data", "science"],
+        ["data", "data", "data"],
+        "msc data science data science msc online data science course".split(),
+    ]
+    cases += [_page(words, vocab, seed) for seed, (words, vocab) in enumerate([(50, 5), (300, 40), (2000, 300), (5000, 2000)])]
+    for tokens in cases:
+        for top_n in (1, 7, 50, 10000):
+            assert _same(calculate_keyword_densities(tokens, top_n), reference_densities(tokens, top_n))
+
+
+def test_ties_keep_first_seen_order():
+    # Every n-gram occurs once, so the result is decided by tie-breaks alone
+    tokens = [f"w{i}" for i in range(100)]
+    assert _same(calculate_keyword_densities(tokens, 50), reference_densities(tokens, 50))
+
+
+def benchmark(tokens, repeat: int = 5):
+    timings = {}
+    for name, fn in (("reference", reference_densities), ("engine", calculate_keyword_densities)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn(tokens, 50)
+        timings[name] = (time.perf_counter() - started) / repeat
+    return timings
+
+
+if __name__ == "__main__":
+    print(f"--- Testing N-gram Density Engine ---")
+    tokens = _page(10000, 3000, seed=1)
+    print(f"Identical output: {_same(calculate_keyword_densities(tokens), reference_densities(tokens))}")
+    timings = benchmark(tokens)
+    print(f"10k-word page: reference {timings['reference'] * 1000:.1f} ms, engine {timings['engine'] * 1000:.1f} ms "
+          f"({timings['reference'] / timings['engine']:.1f}x)")
+    print(f"\n--- Testing Complete ---")
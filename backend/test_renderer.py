@@ -0,0 +1,118 @@
+# backend/test_renderer.py
+#
+# The readiness wait of both renderers, on a fake page: a navigation that
+# destroys the evaluate context is polled through, other errors propagate.
+
+import asyncio
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+from app.services import renderer
+
+DESTROYED = "Execution context was destroyed, most likely because of a navigation"
+
+
+class _Response:
+    status = 200
+
+
+class _FakePage:
+    """Replays `polls`: a signals dict, or an error message to raise."""
+
+    def __init__(self, polls):
+        self.polls = list(polls)
+        self.evaluations = 0
+
+    def route(self, pattern, handler):
+        pass
+
+    def goto(self, url, **kwargs):
+        return _Response()
+
+    def evaluate(self, script):
+        self.evaluations += 1
+        poll = self.polls.pop(0) if len(self.polls) > 1 else self.polls[0]
+        if isinstance(poll, str):
+            raise PlaywrightError(poll)
+        return poll
+
+    def wait_for_timeout(self, ms):
+        pass
+
+    def content(self):
+        return "<html><h1>Course</h1></html>"
+
+
+class _AsyncFakePage(_FakePage):
+    async def route(self, pattern, handler):
+        pass
+
+    async def goto(self, url, **kwargs):
+        return _Response()
+
+    async def evaluate(self, script):
+        return _FakePage.evaluate(self, script)
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def content(self):
+        return _FakePage.content(self)
+
+
+class _FakeContext:
+    def __init__(self, page):
+        self.page = page
+
+    def new_page(self):
+        return self.page
+
+
+class _AsyncFakeContext(_FakeContext):
+    async def new_page(self):
+        return self.page
+
+
+READY = {"textLength": 500, "hasH1": True}
+# A client-side redirect mid-render: the second poll hits the old document
+REDIRECTED = [{"textLength": 10, "hasH1": False}, DESTROYED, READY, READY]
+
+
+def test_render_polls_through_a_navigation(monkeypatch):
+    monkeypatch.setattr(renderer, "RENDER_MODE", "fast")
+    page = _FakePage(REDIRECTED)
+    result = renderer.render_page(_FakeContext(page), "https://example.ac.uk/course")
+    assert result.status_code == 200
+    assert page.evaluations == 4
+
+
+def test_async_render_polls_through_a_navigation(monkeypatch):
+    monkeypatch.setattr(renderer, "RENDER_MODE", "fast")
+    page = _AsyncFakePage(REDIRECTED)
+    result = asyncio.run(renderer.render_page_async(_AsyncFakeContext(page), "https://example.ac.uk/course"))
+    assert result.status_code == 200
+    assert page.evaluations == 4
+
+
+def test_other_evaluate_errors_propagate(monkeypatch):
+    monkeypatch.setattr(renderer, "RENDER_MODE", "fast")
+    page = _FakePage(["Target page, context or browser has been closed"])
+    with pytest.raises(PlaywrightError):
+        renderer.render_page(_FakeContext(page), "https://example.ac.uk/course")
+
+
+def test_budget_ends_the_wait(monkeypatch):
+    monkeypatch.setattr(renderer, "RENDER_MODE", "fast")
+    monkeypatch.setattr(renderer, "RENDER_BUDGET_MS", 50)
+    page = _FakePage([DESTROYED])
+    result = renderer.render_page(_FakeContext(page), "https://example.ac.uk/course")
+    assert result.html.startswith("<html>")
+    assert page.evaluations >= 1
+
+
+if __name__ == "__main__":
+    print(f"--- Testing Render Readiness ---")
+    for test in (test_render_polls_through_a_navigation, test_async_render_polls_through_a_navigation,
+                 test_other_evaluate_errors_propagate, test_budget_ends_the_wait):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            test(monkeypatch)
+    print(f"\n--- Testing Complete ---")
@@ -0,0 +1,77 @@
+# backend/test_singleflight.py
+#
+# Coalesced callers each get their own copy of the leader's result, taken
+# before the leader can change it.
+
+import time
+import threading
+from app.services.singleflight import SingleFlight
+
+
+def test_waiters_get_independent_snapshots():
+    group = SingleFlight("test-snapshots")
+    release = threading.Event()
+    results = {}
+
+    def fetch():
+        release.wait(5)
+        return {"pages": ["a", "b"]}
+
+    def leader():
+        result = group.do("key", fetch)
+        # The leader's job carries on with (and changes) its own result
+        result["pages"].append("mutated")
+        results["leader"] = result
+
+    def waiter(name):
+        results[name] = group.do("key", fetch)
+
+    threads = [threading.Thread(target=leader)]
+    threads[0].start()
+    while group.stats()["in_flight"] == 0:
+        time.sleep(0.01)
+    threads += [threading.Thread(target=waiter, args=(f"waiter-{i}",)) for i in range(3)]
+    for thread in threads[1:]:
+        thread.start()
+    while group.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    waiters = [results[f"waiter-{i}"] for i in range(3)]
+    assert all(result == {"pages": ["a", "b"]} for result in waiters)
+    assert len({id(result["pages"]) for result in waiters + [results["leader"]]}) == 4
+
+
+def test_errors_reach_every_caller():
+    group = SingleFlight("test-errors")
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            group.do("key", fail)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while group.stats()["coalesced"] < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["upstream down"] * 3
+
+
+if __name__ == "__main__":
+    print(f"--- Testing SingleFlight ---")
+    test_waiters_get_independent_snapshots()
+    test_errors_reach_every_caller()
+    print(f"\n--- Testing Complete ---")
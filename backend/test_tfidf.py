@@ -0,0 +1,59 @@
+# backend/test_tfidf.py
+#
+# Checks the sparse TF-IDF path against the original dense implementation
+# and benchmarks both.
+# Run directly for the benchmark:  python test_tfidf.py
+
+import time
+import random
+import warnings
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.services.features import STOP_WORDS, _clean_and_tokenize, calculate_tf_idf
+from test_tokenizer import FIXTURE_CORPUS
+
+
+def reference_tf_idf(documents, max_features=100):
+    """The original implementation: densifies the matrix for every document."""
+    vectorizer = TfidfVectorizer(tokenizer=_clean_and_tokenize, token_pattern=None, stop_words=list(STOP_WORDS),
+                                 ngram_range=(1, 3), max_features=max_features)
+    with warnings.catch_warnings():
+        # Our tokenizer splits contractions in the stop list ("wouldn't"); the tokens are already filtered
+        warnings.filterwarnings("ignore", message="Your stop_words may be inconsistent", category=UserWarning)
+        tfidf_matrix = vectorizer.fit_transform(documents)
+    feature_names = vectorizer.get_feature_names_out()
+    all_doc_scores = []
+    for doc_index in range(tfidf_matrix.shape[0]):
+        scores = tfidf_matrix.toarray()[doc_index]
+        doc_scores = [{"term": feature_names[i], "score": round(score, 4)} for i, score in enumerate(scores) if score > 0]
+        doc_scores.sort(key=lambda x: x['score'], reverse=True)
+        all_doc_scores.append(doc_scores)
+    return {"doc_scores": all_doc_scores, "top_terms": list(feature_names)}
+
+
+def _documents(count: int, words: int, seed: int):
+    rng = random.Random(seed)
+    vocabulary = [f"term{chr(97 + i % 26)}{chr(97 + i // 26 % 26)}" for i in range(600)]
+    return [" ".join(rng.choices(vocabulary, k=words)) for _ in range(count)]
+
+
+def test_matches_reference_output():
+    for documents in (FIXTURE_CORPUS, _documents(8, 400, seed=3)):
+        expected = reference_tf_idf(documents)
+        assert calculate_tf_idf(documents, top_k=None) == expected
+        # top_k keeps a prefix of the full ranking
+        top = calculate_tf_idf(documents, top_k=5)
+        assert top["doc_scores"] == [scores[:5] for scores in expected["doc_scores"]]
+
+
+def test_empty_documents():
+    assert calculate_tf_idf(["", ""]) == {"doc_scores": [[], []], "top_terms": []}
+
+
+if __name__ == "__main__":
+    print(f"--- Testing Sparse TF-IDF ---")
+    documents = _documents(8, 10000, seed=1)
+    for name, fn in (("reference", reference_tf_idf), ("sparse", calculate_tf_idf)):
+        started = time.perf_counter()
+        fn(documents, max_features=5000)
+        print(f"{name}: {(time.perf_counter() - started) * 1000:.1f} ms for 8 x 10k-word pages, 5000 features")
+    print(f"\n--- Testing Complete ---")
@@ -0,0 +1,159 @@
+# backend/test_tokenizer.py
+#
+# Parity report and benchmark for the regex and NLTK tokenizer paths.
+# Run directly for the report:  python test_tokenizer.py
+# Regenerate the golden tokens:  python test_tokenizer.py --write-golden
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+import pytest
+from app.services import features
+from app.services.features import _clean_and_tokenize
+
+# Course-page style text with the cases the two paths could disagree on:
+# contractions, possessives, hyphenated words, abbreviations, numbers,
+# currency, slashes, URLs, emails and non-ASCII letters.
+FIXTURE_CORPUS = [
+    """MSc Data Science. Our full-time, one-year programme gives you the skills
+    employers want. You'll study machine learning, statistics and big-data
+    engineering, and complete a 60-credit dissertation with an industry partner.""",
+
+    """Why choose this course? It's accredited by the BCS, the Chartered Institute
+    for IT. Students' projects have won national awards, and 94% of graduates are
+    in work or further study within 15 months (Graduate Outcomes 2023).""",
+
+    """Entry requirements: a 2:1 honours degree (or international equivalent) in
+    computer science, maths, physics or engineering. IELTS 6.5 overall, with no
+    less than 6.0 in each component. Don't have the standard qualifications?
+    We consider applicants with relevant work experience, e.g. in analytics/BI roles.""",
+
+    """Fees for 2024/25: UK students £9,250 per year; international students £18,500.
+    Scholarships of up to £5,000 are available. Contact admissions@example.ac.uk or
+    visit https://www.example.ac.uk/fees for details. Part-time study is available.""",
+
+    """Modules include: Applied Statistics; Deep Learning & Neural Networks; Cloud
+    Computing (AWS/Azure); Data Ethics; Research Methods. You can't take both
+    Optimisation and Operational Research. The university's café and library are
+    open 24/7. Résumé workshops run weekly — naïve Bayes isn't the only model you'll meet!""",
+
+    """Teaching is delivered through lectures, seminars and hands-on labs. Assessment
+    is 60% coursework and 40% exams. The U.K. campus is a 10-minute walk from the
+    station; the Dubai campus opened in 2019. Year-in-industry placements available.""",
+]
+
+
+# One sentence per entry with NLTK's word_tokenize output (lowercased,
+# alphabetic only, before stop-word removal), so parity is checked without
+# downloading any NLTK data.
+GOLDEN_PATH = Path(__file__).with_name("test_tokenizer_golden.json")
+
+GOLDEN_SENTENCES = [
+    *(sentence for text in FIXTURE_CORPUS
+      for sentence in re.split(r"(?<=[.?!])\s+(?=[A-Z])", " ".join(text.split()))),
+    "rock 'n' roll", "rock'n'roll", "C++ and C#", "x=y and a+b", "#hashtag @user",
+    "we're here, they'd've gone", "I'm I'll you've they're", "don't can't won't",
+    "gonna wanna gimme lemme cannot", "more'n enough", "'tis 'twas", "y'all",
+    "O'Neill's course", "the students' union", "well-known 'ello", "c'est la vie",
+    "full- and part-time", "-based", "a--b", "wait...what", "it's 9am-5pm",
+    "3,36 euros", "data_science", "naïve café",
+]
+
+
+def write_golden():
+    """Regenerates the golden tokens from NLTK (no data needed for one sentence)."""
+    from nltk.tokenize import word_tokenize
+    golden = [
+        {"text": text,
+         "tokens": [t for t in word_tokenize(text.lower(), preserve_line=True) if t.isalpha()]}
+        for text in GOLDEN_SENTENCES
+    ]
+    lines = ",\n".join(json.dumps(entry, ensure_ascii=False) for entry in golden)
+    GOLDEN_PATH.write_text(f"[\n{lines}\n]\n", encoding="utf-8")
+    return golden
+
+
+def _nltk_available() -> bool:
+    try:
+        features.word_tokenize("Check punkt.")
+        features.stopwords.words('english')
+        return True
+    except LookupError:
+        return False
+
+
+def parity_report():
+    """Per-document token differences between the regex and NLTK paths."""
+    rows = []
+    for i, text in enumerate(FIXTURE_CORPUS):
+        fast = _clean_and_tokenize(text, tokenizer="regex")
+        slow = _clean_and_tokenize(text, tokenizer="nltk")
+        rows.append({
+            "doc": i,
+            "regex_tokens": len(fast),
+            "nltk_tokens": len(slow),
+            "identical": fast == slow,
+            "only_regex": sorted(set(fast) - set(slow)),
+            "only_nltk": sorted(set(slow) - set(fast)),
+        })
+    return rows
+
+
+def benchmark(tokenizer: str, repeat: int = 200) -> float:
+    """Tokens per second for one tokenizer path over the fixture corpus."""
+    corpus = " ".join(FIXTURE_CORPUS)
+    started = time.perf_counter()
+    tokens = 0
+    for _ in range(repeat):
+        tokens += len(_clean_and_tokenize(corpus, tokenizer=tokenizer))
+    return tokens / (time.perf_counter() - started)
+
+
+def test_regex_tokenizer_keeps_only_alphabetic_non_stop_words():
+    tokens = _clean_and_tokenize("The full-time MSc (2024) isn't the university's £9,250 course.", tokenizer="regex")
+    assert tokens == ["msc", "university", "course"]
+
+
+def test_regex_tokenizer_matches_nltk_golden_tokens():
+    golden = json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+    assert [entry["text"] for entry in golden] == GOLDEN_SENTENCES, "golden file is stale; run --write-golden"
+    for entry in golden:
+        expected = [t for t in entry["tokens"] if t not in features.STOP_WORDS]
+        assert _clean_and_tokenize(entry["text"], tokenizer="regex") == expected, entry["text"]
+
+
+def test_regex_tokenizer_matches_nltk_on_fixture_corpus():
+    if not _nltk_available():
+        pytest.skip("NLTK punkt/stopwords data not installed")
+    mismatches = [row for row in parity_report() if not row["identical"]]
+    assert not mismatches, mismatches
+
+
+if __name__ == "__main__":
+    if "--write-golden" in sys.argv:
+        print(f"Wrote {len(write_golden())} sentences to {GOLDEN_PATH.name}")
+        sys.exit(0)
+
+    print(f"--- Tokenizer Parity & Benchmark ---")
+    print(f"Stop words: {len(features.STOP_WORDS)}")
+
+    regex_rate = benchmark("regex")
+    print(f"regex: {regex_rate:,.0f} tokens/sec")
+
+    if not _nltk_available():
+        print("NLTK data not installed; skipping the NLTK parity report and benchmark.")
+    else:
+        nltk_rate = benchmark("nltk", repeat=20)
+        print(f"nltk:  {nltk_rate:,.0f} tokens/sec ({regex_rate / nltk_rate:.1f}x slower than regex)")
+
+        print("\n--- Parity (regex vs NLTK) ---")
+        for row in parity_report():
+            status = "identical" if row["identical"] else f"differs: +{row['only_regex']} -{row['only_nltk']}"
+            print(f"doc {row['doc']}: {row['regex_tokens']} vs {row['nltk_tokens']} tokens, {status}")
+
+    test_regex_tokenizer_matches_nltk_golden_tokens()
+    print("\nGolden tokens: regex matches NLTK")
+
+    print("\n--- Testing Complete ---")
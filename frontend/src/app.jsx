@@ -23,32 +23,84 @@ function App() {
     const [reportData, setReportData] = useState(null);
     const [error, setError] = useState(null);
 
-    let pollInterval;
-
-    // --- API Polling Logic ---
-    const pollForResults = (id) => {
-        pollInterval = setInterval(async () => {
-            try {
-                const response = await axios.get(`${API_BASE_URL}/results/${id}`);
-                const { status, report, error: jobError } = response.data;
-
-                if (status === 'COMPLETE') {
-                    clearInterval(pollInterval);
-                    setIsLoading(false);
-                    setReportData(report);
-                    setError(null);
-                } else if (status === 'FAILED') {
-                    clearInterval(pollInterval);
-                    setIsLoading(false);
-                    setError(jobError || 'The analysis failed to complete.');
-                    setReportData(null);
-                }
-            } catch (err) {
-                clearInterval(pollInterval);
+    const [progress, setProgress] = useState({ percent: 0, label: '' });
+
+    let eventSource;
+
+    // Rough share of the run each phase accounts for, for the progress bar
+    const phaseProgress = {
+        queued: 2,
+        running: 5,
+        search_done: 15,
+        scrape_done: 60,
+        features_done: 65,
+        llm_done: 98,
+    };
+
+    // --- Progress Stream (Server-Sent Events) ---
+    const listenForResults = (id) => {
+        eventSource = new EventSource(`${API_BASE_URL}/results/${id}/events`);
+        const data = (event) => JSON.parse(event.data);
+
+        eventSource.addEventListener('queued', (event) => {
+            const { position } = data(event);
+            setProgress({ percent: phaseProgress.queued, label: position ? `Queued (#${position})` : 'Starting...' });
+        });
+        eventSource.addEventListener('running', () => {
+            setProgress({ percent: phaseProgress.running, label: 'Searching competitors...' });
+        });
+        eventSource.addEventListener('search_done', (event) => {
+            const { competitors } = data(event);
+            setProgress({ percent: phaseProgress.search_done, label: `Found ${competitors.length} competitors` });
+        });
+        eventSource.addEventListener('page_scraped', (event) => {
+            const { index, total } = data(event);
+            setProgress((current) => {
+                const done = (current.pagesDone || 0) + 1;
+                const span = phaseProgress.scrape_done - phaseProgress.search_done;
+                return {
+                    percent: phaseProgress.search_done + Math.round((span * done) / total),
+                    label: index === 0 ? 'Scraped your page' : `Scraped competitor ${index} (${done}/${total})`,
+                    pagesDone: done,
+                };
+            });
+        });
+        eventSource.addEventListener('scrape_done', () => {
+            setProgress({ percent: phaseProgress.scrape_done, label: 'Extracting features...' });
+        });
+        eventSource.addEventListener('features_done', () => {
+            setProgress({ percent: phaseProgress.features_done, label: 'Generating report...' });
+        });
+        // Report nodes arrive one by one while the model is still writing the rest
+        eventSource.addEventListener('node', (event) => {
+            const { name, data: node } = data(event);
+            setReportData((current) => ({ ...(current || {}), [name]: node }));
+        });
+        eventSource.addEventListener('llm_done', () => {
+            setProgress({ percent: phaseProgress.llm_done, label: 'Finishing...' });
+        });
+        eventSource.addEventListener('complete', (event) => {
+            eventSource.close();
+            setIsLoading(false);
+            setProgress({ percent: 100, label: 'Complete' });
+            setReportData(data(event).report);
+            setError(null);
+        });
+        // Sent by the server for failed jobs (a plain connection error has no data)
+        eventSource.addEventListener('failed', (event) => {
+            eventSource.close();
+            setIsLoading(false);
+            setError(data(event).error || 'The analysis failed to complete.');
+            setReportData(null);
+        });
+        eventSource.onerror = () => {
+            // EventSource reconnects by itself (resuming after the last event);
+            // only give up if the server has closed the stream for good.
+            if (eventSource.readyState === EventSource.CLOSED) {
                 setIsLoading(false);
                 setError('Failed to fetch results from the server.');
             }
-        }, 5000);
+        };
     };
 
     // --- API Start Logic ---
@@ -57,7 +109,8 @@ function App() {
         setReportData(null);
         setError(null);
         setJobId(null);
-        if (pollInterval) clearInterval(pollInterval);
+        setProgress({ percent: 0, label: '' });
+        if (eventSource) eventSource.close();
 
         try {
             const response = await axios.post(`${API_BASE_URL}/analyze`, {
@@ -68,7 +121,7 @@ function App() {
             const { job_id } = response.data;
             if (job_id) {
                 setJobId(job_id);
-                pollForResults(job_id);
+                listenForResults(job_id);
             } else {
                 throw new Error('No Job ID received from server.');
             }
@@ -80,55 +133,62 @@ function App() {
 
     // --- Render Functions ---
 
-    const renderContent = () => {
-        if (isLoading) {
-            return (
-                <WorkflowNode icon="" title="Loading all nodes...">
-                    <Node2_Competitors data={null} isLoading={true} />
-                </WorkflowNode>
-            );
-        }
+    // Shown in place of a node that hasn't arrived yet
+    const pending = <Node2_Competitors data={null} isLoading={true} />;
 
+    const renderContent = () => {
         if (error) {
             return <div className="error-message"><strong>Error:</strong> {error}</div>;
         }
 
         if (reportData) {
-            // We have data, render all the nodes
+            // Render every node we have; the rest are still streaming in
             return (
                 <>
                     {/* --- The 4 Nodes --- */}
                     <WorkflowNode icon="" title="Node 1: Keyword & Performance Scan">
-                        <Node1_Keywords data={reportData.node_1_keywords} />
+                        {reportData.node_1_keywords ? <Node1_Keywords data={reportData.node_1_keywords} /> : pending}
                     </WorkflowNode>
 
                     <WorkflowNode icon="" title="Node 2: Competitive Benchmarking">
-                        <Node2_Competitors data={reportData.node_2_competitors} />
+                        {reportData.node_2_competitors ? <Node2_Competitors data={reportData.node_2_competitors} /> : pending}
                     </WorkflowNode>
 
                     <WorkflowNode icon="" title="Node 3: Content Rewrite & Enhancement">
-                        <Node3_Content data={reportData.node_3_content_rewrite} />
+                        {reportData.node_3_content_rewrite ? <Node3_Content data={reportData.node_3_content_rewrite} /> : pending}
                     </WorkflowNode>
 
                     <WorkflowNode icon="" title="Node 4: Metadata Generation">
-                        <Node5_Metadata data={reportData.node_5_metadata} />
+                        {reportData.node_5_metadata ? <Node5_Metadata data={reportData.node_5_metadata} /> : pending}
                     </WorkflowNode>
 
-                    {/* --- Static Apply Button --- */}
-                    <div style={{ display: 'flex', justifyContent: 'flex-end', padding: '1rem 0' }}>
-                        <button className="btn btn-primary" onClick={() => alert('Changes applied! (Demo)')}>
-                            Apply Changes
-                        </button>
-                    </div>
+                    {!isLoading && (
+                        <>
+                            {/* --- Static Apply Button --- */}
+                            <div style={{ display: 'flex', justifyContent: 'flex-end', padding: '1rem 0' }}>
+                                <button className="btn btn-primary" onClick={() => alert('Changes applied! (Demo)')}>
+                                    Apply Changes
+                                </button>
+                            </div>
 
-                    <hr style={{ border: 0, borderTop: '1px solid var(--border-color)', margin: '2rem 0' }} />
+                            <hr style={{ border: 0, borderTop: '1px solid var(--border-color)', margin: '2rem 0' }} />
+                        </>
+                    )}
 
                     {/* --- Final Scores Block (Not a Node) --- */}
-                    <FinalScores data={reportData.final_scores} />
+                    {reportData.final_scores && <FinalScores data={reportData.final_scores} />}
                 </>
             );
         }
 
+        if (isLoading) {
+            return (
+                <WorkflowNode icon="" title="Loading all nodes...">
+                    {pending}
+                </WorkflowNode>
+            );
+        }
+
         // Default empty state
         return <div style={{ color: "var(--text-light)" }}>Click "Apply Filters" in the sidebar to run an audit.</div>;
     };
@@ -144,7 +204,9 @@ function App() {
             </div>
             <WorkflowProgress
                 isLoading={isLoading}
-                isComplete={!!reportData}
+                isComplete={!isLoading && !!reportData}
+                progress={progress.percent}
+                label={progress.label}
             />
         </>
     );
@@ -1,11 +1,12 @@
 import React from 'react';
 
-export function WorkflowProgress({ isLoading, isComplete }) {
+export function WorkflowProgress({ isLoading, isComplete, progress: reported = 0, label = '' }) {
     let node = 0;
     let progress = 0;
     if (isLoading) {
-        node = 1; // Simulating "Analyzing Competitors"
-        progress = 47;
+        // Live progress from the server's event stream
+        progress = reported;
+        node = Math.min(4, 1 + Math.floor(progress / 25));
     }
     if (isComplete) {
         node = 4;
@@ -28,7 +29,9 @@ export function WorkflowProgress({ isLoading, isComplete }) {
                     ></div>
                 </div>
             </div>
-            <span style={{ color: 'var(--text-light)', fontSize: '0.9rem' }}>Node {node} of 4</span>
+            <span style={{ color: 'var(--text-light)', fontSize: '0.9rem' }}>
+                {isLoading && label ? `${label} · ` : ''}Node {node} of 4
+            </span>
         </footer>
     );
 }
\ No newline at end of file